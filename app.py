@@ -18,6 +18,8 @@ def run_scraper(script_name: str):
     """Run a source-specific script and return combined stdout + stderr."""
     env = os.environ.copy()
     env["HEADLESS"] = "true"
+    # A rerun after a timeout picks up the previous run's checkpoint
+    env.setdefault("RESUME", "true")
     try:
         result = subprocess.run(
             [sys.executable, script_name],
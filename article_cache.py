@@ -0,0 +1,221 @@
+"""
+Persistent cache of extracted articles, keyed by canonical URL.
+The same news URLs come up across countries and across successive runs; a hit
+skips both the download and the trafilatura extraction. Failures and empty
+pages are cached too (negative caching) with a shorter TTL. The store is a
+single SQLite file, trimmed least-recently-used first when it grows past
+ARTICLE_CACHE_MAX_BYTES. Expired entries that came with ETag/Last-Modified
+validators are kept for ARTICLE_CACHE_STALE_SECONDS so the fetcher can
+revalidate them with a conditional GET instead of downloading again.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import Any
+
+from config import (
+    ARTICLE_CACHE_MAX_BYTES,
+    ARTICLE_CACHE_NEGATIVE_TTL_SECONDS,
+    ARTICLE_CACHE_STALE_SECONDS,
+    ARTICLE_CACHE_TTL_SECONDS,
+    CACHE_DIR,
+)
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = ("fbclid", "gclid", "dclid", "ocid", "cmpid", "smid", "mc_cid", "mc_eid", "ref", "ref_src")
+
+
+def cache_dir() -> str:
+    path = os.environ.get("CACHE_DIR") or CACHE_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different links to the same article share a key."""
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urllib.parse.urlunsplit((scheme, host, path, urllib.parse.urlencode(query), ""))
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("ARTICLE_CACHE", "true").strip().lower() == "true"
+
+
+class ArticleCache:
+    """Thread-safe SQLite store: canonical URL -> { title, content, success, error }."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+        max_bytes: int | None = None,
+        stale_seconds: float | None = None,
+    ):
+        self.path = path or os.path.join(cache_dir(), "articles.sqlite3")
+        self.ttl = float(ttl if ttl is not None else os.environ.get(
+            "ARTICLE_CACHE_TTL_SECONDS", ARTICLE_CACHE_TTL_SECONDS
+        ))
+        self.negative_ttl = float(negative_ttl if negative_ttl is not None else os.environ.get(
+            "ARTICLE_CACHE_NEGATIVE_TTL_SECONDS", ARTICLE_CACHE_NEGATIVE_TTL_SECONDS
+        ))
+        self.max_bytes = int(max_bytes if max_bytes is not None else os.environ.get(
+            "ARTICLE_CACHE_MAX_BYTES", ARTICLE_CACHE_MAX_BYTES
+        ))
+        self.stale_seconds = float(stale_seconds if stale_seconds is not None else os.environ.get(
+            "ARTICLE_CACHE_STALE_SECONDS", ARTICLE_CACHE_STALE_SECONDS
+        ))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                title TEXT NOT NULL DEFAULT '',
+                content TEXT NOT NULL DEFAULT '',
+                success INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE articles ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_last_access ON articles (last_access)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        """Return the cached article for `url` if present and not expired."""
+        key = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, content, success, error, expires_at FROM articles WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[4] <= now:
+                return None
+            self._conn.execute("UPDATE articles SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return self._article(url, row)
+
+    @staticmethod
+    def _article(url: str, row: tuple) -> dict[str, Any]:
+        article = {"url": url, "title": row[0], "content": row[1], "success": bool(row[2]), "cached": True}
+        if row[3]:
+            article["error"] = row[3]
+        return article
+
+    def validators(self, url: str) -> dict[str, str] | None:
+        """ETag/Last-Modified stored with an expired entry, for a conditional refetch."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM articles WHERE key = ?",
+                (canonical_url(url),),
+            ).fetchone()
+        if row is None or not (row[0] or row[1]):
+            return None
+        return {"etag": row[0], "last_modified": row[1]}
+
+    def refresh(self, url: str) -> dict[str, Any] | None:
+        """The server answered 304: extend the entry's lifetime and return it."""
+        key = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, content, success, error FROM articles WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            expires_at = now + (self.ttl if row[2] else self.negative_ttl)
+            self._conn.execute(
+                "UPDATE articles SET fetched_at = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                (now, expires_at, now, key),
+            )
+            self._conn.commit()
+        return self._article(url, row)
+
+    def put(
+        self,
+        url: str,
+        article: dict[str, Any],
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Store an extraction result; failures and empty pages get the negative TTL."""
+        title = article.get("title") or ""
+        content = article.get("content") or ""
+        success = bool(article.get("success") and content)
+        now = time.time()
+        expires_at = now + (self.ttl if success else self.negative_ttl)
+        size = len(title.encode("utf-8")) + len(content.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO articles
+                    (key, title, content, success, error, fetched_at, expires_at, last_access, size,
+                     etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    canonical_url(url), title, content, int(success), article.get("error"),
+                    now, expires_at, now, size, etag, last_modified,
+                ),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Expired entries go unless they carry validators and are within the stale window
+        self._conn.execute(
+            """
+            DELETE FROM articles
+            WHERE expires_at <= ?
+              AND ((etag IS NULL AND last_modified IS NULL) OR expires_at <= ?)
+            """,
+            (now, now - self.stale_seconds),
+        )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until back under the cap
+        excess = total - self.max_bytes
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM articles ORDER BY last_access ASC"
+        ).fetchall():
+            if excess <= 0:
+                break
+            self._conn.execute("DELETE FROM articles WHERE key = ?", (key,))
+            excess -= size
@@ -2,39 +2,240 @@
 Extract main article content from URLs using trafilatura.
 """
 
+import codecs
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
 import requests
-from trafilatura import extract
-from config import ARTICLE_REQUEST_TIMEOUT, USER_AGENT
+from trafilatura import bare_extraction
+from config import (
+    ADAPTIVE_TIMEOUT_MIN_SECONDS,
+    ADAPTIVE_TIMEOUT_MULTIPLIER,
+    ARTICLE_MAX_BYTES,
+    ARTICLE_REQUEST_TIMEOUT,
+    HOST_BREAKER_COOLDOWN_SECONDS,
+    HOST_BREAKER_FAILURES,
+    USER_AGENT,
+)
+from host_limits import AdaptiveTimeouts, HostCircuitBreaker, host_of
+import metrics
+
+# Links to these are never article pages; they are skipped without a request
+NON_HTML_EXTENSIONS = (
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".gz",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".webm", ".m3u8",
+)
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+# Statuses that say the link is dead, not that the host is unwell
+_LINK_STATUSES = (404, 410)
+
+_guards_lock = threading.Lock()
+_guards: tuple[HostCircuitBreaker, AdaptiveTimeouts] | None = None
+
+
+def host_guards() -> tuple[HostCircuitBreaker, AdaptiveTimeouts]:
+    """Process-wide circuit breakers and adaptive timeouts for publisher hosts, built on first use."""
+    global _guards
+    with _guards_lock:
+        if _guards is None:
+            _guards = (
+                HostCircuitBreaker(
+                    int(os.environ.get("HOST_BREAKER_FAILURES", str(HOST_BREAKER_FAILURES))),
+                    float(os.environ.get("HOST_BREAKER_COOLDOWN_SECONDS", str(HOST_BREAKER_COOLDOWN_SECONDS))),
+                ),
+                AdaptiveTimeouts(
+                    ARTICLE_REQUEST_TIMEOUT,
+                    float(os.environ.get("ADAPTIVE_TIMEOUT_MIN_SECONDS", str(ADAPTIVE_TIMEOUT_MIN_SECONDS))),
+                    float(os.environ.get("ADAPTIVE_TIMEOUT_MULTIPLIER", str(ADAPTIVE_TIMEOUT_MULTIPLIER))),
+                ),
+            )
+        return _guards
+
+
+def is_html_content_type(content_type: str | None) -> bool:
+    """True for HTML/XHTML responses, and for responses that don't say (servers often omit it)."""
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return not media_type or media_type in ("text/html", "application/xhtml+xml")
 
 
-def extract_article_content(url: str) -> dict:
+def _decode(body: bytes, resp: requests.Response, truncated: bool = False) -> str:
+    # Only trust a charset the server actually sent; requests otherwise assumes
+    # ISO-8859-1 for text/*, which garbles most modern pages
+    if "charset" in (resp.headers.get("Content-Type") or "").lower() and resp.encoding:
+        try:
+            return body.decode(resp.encoding, errors="replace")
+        except LookupError:
+            pass
+    try:
+        # A multibyte character cut off by the size cap is dropped instead of
+        # sending the whole page down the cp1252 path
+        return codecs.getincrementaldecoder("utf-8")().decode(body, final=not truncated)
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+
+def fetch_article_html(
+    url: str,
+    session: requests.Session | None = None,
+    validators: dict | None = None,
+) -> dict:
     """
-    Fetch URL and extract main text content.
-    Returns dict with url, title, text, and success flag.
+    Download a page. Returns dict with url, html, etag, last_modified and, on
+    failure, error. Pass a shared session to reuse pooled connections.
+    With `validators` ({etag, last_modified} from an earlier response) the request
+    is conditional; a 304 returns not_modified=True and no html.
+    The body is streamed: links to files and non-HTML responses are dropped before
+    it is read (skipped=True), and reading stops after ARTICLE_MAX_BYTES
+    (truncated=True). status_code is set whenever the server answered.
+    The request timeout adapts to the host's recent response times, and a host
+    that keeps timing out or erroring is skipped (circuit_open=True) for a while.
     """
-    result = {"url": url, "title": "", "content": "", "success": False}
+    result = {"url": url, "html": "", "etag": None, "last_modified": None}
+    if urlsplit(url).path.lower().endswith(NON_HTML_EXTENSIONS):
+        result["error"] = "not an HTML page (file link)"
+        result["skipped"] = True
+        metrics.inc("fetches", result="skipped")
+        return result
+    headers = {"User-Agent": USER_AGENT}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    max_bytes = int(os.environ.get("ARTICLE_MAX_BYTES", str(ARTICLE_MAX_BYTES)))
+    domain = host_of(url)
+    breaker, timeouts = host_guards()
+    if not breaker.allow(domain):
+        result["error"] = f"circuit open for {domain}"
+        result["skipped"] = True
+        result["circuit_open"] = True
+        metrics.inc("fetches", result="circuit_open")
+        return result
+    timeout = timeouts.timeout(domain)
+    healthy = False
+    start = time.perf_counter()
     try:
-        resp = requests.get(
+        with (session or requests).get(
             url,
-            timeout=ARTICLE_REQUEST_TIMEOUT,
-            headers={"User-Agent": USER_AGENT},
+            timeout=timeout,
+            headers=headers,
             allow_redirects=True,
-        )
-        resp.raise_for_status()
-        html = resp.text
-        text = extract(
+            stream=True,
+        ) as resp:
+            result["status_code"] = resp.status_code
+            healthy = resp.status_code < 400 or resp.status_code in _LINK_STATUSES
+            if resp.status_code == 304 and validators:
+                result["not_modified"] = True
+                metrics.inc("fetches", result="not_modified")
+                return result
+            resp.raise_for_status()
+            content_type = resp.headers.get("Content-Type")
+            if not is_html_content_type(content_type):
+                result["error"] = f"not an HTML page ({content_type})"
+                result["skipped"] = True
+                metrics.inc("fetches", result="skipped")
+                return result
+            body = bytearray()
+            for chunk in resp.iter_content(_READ_CHUNK_BYTES):
+                body += chunk
+                if len(body) >= max_bytes:
+                    del body[max_bytes:]
+                    result["truncated"] = True
+                    break
+                # The timeout above is per read; a page trickling in still gets cut off
+                if time.perf_counter() - start > timeout:
+                    raise requests.Timeout(f"download took over {timeout:.1f}s")
+            metrics.inc("bytes_downloaded", len(body), domain=domain)
+            result["html"] = _decode(bytes(body), resp, bool(result.get("truncated")))
+            result["etag"] = resp.headers.get("ETag")
+            result["last_modified"] = resp.headers.get("Last-Modified")
+        metrics.inc("fetches", result="truncated" if result.get("truncated") else "ok")
+    except Exception as e:
+        result["error"] = str(e)
+        if not isinstance(e, requests.HTTPError):
+            healthy = False
+        metrics.inc("fetches", result="error")
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("fetch_seconds", elapsed, domain=domain)
+        if healthy:
+            timeouts.observe(domain, elapsed)
+        if breaker.record(domain, healthy):
+            metrics.inc("circuit_opened", domain=domain)
+            print(f"  Circuit open for {domain} after repeated timeouts/errors; skipping it for now.")
+    return result
+
+
+def extract_from_html(url: str, html: str) -> dict:
+    """
+    Extract main text and title from downloaded HTML in a single parse.
+    Returns dict with url, title, content, success flag and cpu_seconds (the
+    extraction's CPU time, reported back since it may run in another process;
+    per thread, so concurrent inline extractions don't count each other's work).
+    Module-level and picklable so it can run in a process pool.
+    """
+    result = {"url": url, "title": "", "content": "", "success": False}
+    start = time.thread_time()
+    try:
+        doc = bare_extraction(
             html,
             include_comments=False,
             include_tables=True,
             no_fallback=False,
+            with_metadata=True,
         )
+        if doc is not None and not isinstance(doc, dict):
+            doc = doc.as_dict()
+        doc = doc or {}
+        text = doc.get("text")
         if text:
             result["content"] = text.strip()
             result["success"] = True
-        from trafilatura import extract_metadata
-        meta = extract_metadata(html)
-        if meta and meta.title:
-            result["title"] = meta.title
+        if doc.get("title"):
+            result["title"] = doc["title"]
     except Exception as e:
         result["error"] = str(e)
+    result["cpu_seconds"] = time.thread_time() - start
+    return result
+
+
+def record_extraction(article: dict) -> dict:
+    """Move an extraction result's cpu_seconds into the run metrics."""
+    cpu_seconds = article.pop("cpu_seconds", None)
+    if cpu_seconds is not None:
+        metrics.observe("extract_cpu_seconds", cpu_seconds)
+    return article
+
+
+def extract_article_content(url: str, session: requests.Session | None = None, cache=None) -> dict:
+    """
+    Fetch URL and extract main text content.
+    Returns dict with url, title, text, and success flag.
+    With an ArticleCache, a fresh cached result is returned without fetching,
+    an expired one is revalidated with a conditional GET, and new results
+    (including failures) are stored.
+    """
+    validators = None
+    if cache is not None:
+        cached = cache.get(url)
+        if cached is not None:
+            return cached
+        validators = cache.validators(url)
+    page = fetch_article_html(url, session, validators)
+    if page.get("not_modified") and cache is not None:
+        refreshed = cache.refresh(url)
+        if refreshed is not None:
+            return refreshed
+        page = fetch_article_html(url, session)
+    if page.get("error"):
+        result = {"url": url, "title": "", "content": "", "success": False, "error": page["error"]}
+    else:
+        result = record_extraction(extract_from_html(url, page["html"]))
+    if cache is not None and not page.get("circuit_open"):
+        cache.put(url, result, page.get("etag"), page.get("last_modified"))
     return result
@@ -0,0 +1,295 @@
+"""
+Concurrent article fetching for the enrichment stage.
+Fetches candidate URLs for many trends at once over a pooled requests.Session,
+with a global concurrency limit and a per-domain limit. The per-domain limit is
+applied when work is scheduled: a candidate whose publisher is at its limit is
+passed over for the trend's next one and retried later, so fetch threads never
+sit waiting on a busy host. Downloaded HTML is handed to a process pool for
+trafilatura extraction, so network I/O and CPU-bound parsing overlap. Each
+trend only keeps as many URLs in flight as it still needs articles, and its
+queued work is cancelled once it has enough.
+Results (including failures) go through the on-disk ArticleCache, so repeat
+URLs are neither downloaded nor re-extracted; expired entries are revalidated
+with a conditional GET and a 304 reuses the stored extraction.
+Within a trend, an article whose content SimHash is within
+ARTICLE_DUPLICATE_DISTANCE bits of one already kept (a syndicated copy) is
+rejected and the next candidate fetched instead.
+Each trend's candidates are tried most productive publisher first, from the
+per-domain DomainStats this fetcher keeps up to date.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from article_cache import ArticleCache, cache_enabled
+from article_extractor import extract_from_html, fetch_article_html, record_extraction
+from domain_stats import DomainStats, domain_stats_enabled
+from config import (
+    ARTICLE_DUPLICATE_DISTANCE,
+    ARTICLE_EXTRACTION_WORKERS,
+    ARTICLE_FETCH_CONCURRENCY,
+    ARTICLE_FETCH_PER_DOMAIN,
+)
+from host_limits import HostConcurrencyLimiter, host_of
+import metrics
+from similarity import hamming, simhash
+
+# How often the scheduler rechecks candidates deferred for a busy host
+_DEFERRED_POLL_SECONDS = 0.05
+
+
+class ArticleFetcher:
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        per_domain: int | None = None,
+        extraction_workers: int | None = None,
+        cache: ArticleCache | None = None,
+        duplicate_distance: int | None = None,
+        domain_stats: DomainStats | None = None,
+    ):
+        if concurrency is None:
+            concurrency = int(os.environ.get("ARTICLE_FETCH_CONCURRENCY", str(ARTICLE_FETCH_CONCURRENCY)))
+        if per_domain is None:
+            per_domain = int(os.environ.get("ARTICLE_FETCH_PER_DOMAIN", str(ARTICLE_FETCH_PER_DOMAIN)))
+        if extraction_workers is None:
+            extraction_workers = int(
+                os.environ.get("ARTICLE_EXTRACTION_WORKERS", str(ARTICLE_EXTRACTION_WORKERS))
+            )
+        if duplicate_distance is None:
+            duplicate_distance = int(os.environ.get("ARTICLE_DUPLICATE_DISTANCE", str(ARTICLE_DUPLICATE_DISTANCE)))
+        self.concurrency = max(concurrency, 1)
+        # Negative: keep near-duplicate articles
+        self.duplicate_distance = duplicate_distance
+        self._owns_cache = cache is None and cache_enabled()
+        self.cache = ArticleCache() if self._owns_cache else cache
+        self._owns_domain_stats = domain_stats is None and domain_stats_enabled()
+        self.domain_stats = DomainStats() if self._owns_domain_stats else domain_stats
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._domains = HostConcurrencyLimiter(per_domain)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="article-fetch")
+        # 0 workers: extract on the fetching thread instead of a process pool
+        self._extractors = ProcessPoolExecutor(max_workers=extraction_workers) if extraction_workers > 0 else None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._extractors is not None:
+            self._extractors.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self._owns_cache:
+            self.cache.close()
+        if self._owns_domain_stats:
+            self.domain_stats.close()
+
+    def __enter__(self) -> "ArticleFetcher":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _fetch(self, url: str, validators: dict | None = None) -> dict:
+        """Download (and, without extractor processes, extract) `url`; its host slot is already held."""
+        try:
+            start = time.perf_counter()
+            page = fetch_article_html(url, self.session, validators)
+            if self.domain_stats is not None and not page.get("skipped"):
+                self.domain_stats.record_latency(url, time.perf_counter() - start)
+        finally:
+            self._domains.release(host_of(url))
+        if self._extractors is not None or page.get("error") or page.get("not_modified"):
+            return page
+        art = record_extraction(extract_from_html(url, page["html"]))
+        art["etag"] = page["etag"]
+        art["last_modified"] = page["last_modified"]
+        return art
+
+    def collect(
+        self,
+        url_lists: list[list[str]],
+        max_articles: int,
+        min_content_length: int,
+        on_done: Callable[[int, list[dict[str, Any]]], None] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        For each list of candidate URLs, return up to `max_articles` articles with
+        at least `min_content_length` characters of content, in candidate order.
+        `on_done(index, articles)` is called as soon as each list is finished.
+        """
+        jobs = []
+        for urls in url_lists:
+            ordered = self.domain_stats.order(urls) if self.domain_stats is not None else list(urls)
+            jobs.append({
+                "urls": ordered,
+                # Candidate indexes not started yet, in order; deferred ones go back to the front
+                "remaining": list(range(len(ordered))),
+                # url index -> cache validators, once the cache has been consulted
+                "checked": {},
+                "in_flight": set(),
+                "found": {},
+                "fingerprints": [],
+            })
+        pending: dict[Future, tuple[int, int]] = {}
+        # Jobs with candidates waiting for a busy host
+        blocked: set[int] = set()
+        # (job, url) -> response validators, held while the HTML is being extracted
+        page_validators: dict[tuple[int, int], dict] = {}
+
+        def satisfied(job: dict) -> bool:
+            return len(job["found"]) >= max_articles
+
+        def articles_of(job: dict) -> list[dict[str, Any]]:
+            return [job["found"][index] for index in sorted(job["found"])][:max_articles]
+
+        def report(job_index: int) -> None:
+            job = jobs[job_index]
+            finished = satisfied(job) or (not job["in_flight"] and not job["remaining"])
+            if on_done is not None and finished and not job.get("reported"):
+                job["reported"] = True
+                on_done(job_index, articles_of(job))
+
+        def accept(job: dict, url_index: int, art: dict) -> None:
+            content = (art.get("content") or "").strip()
+            if not art or art.get("error"):
+                outcome = "failure"
+            elif art.get("success") and len(content) >= min_content_length:
+                outcome = "success"
+            else:
+                outcome = "empty"
+            if outcome == "success" and self.duplicate_distance >= 0:
+                fingerprint = simhash(content)
+                if any(hamming(fingerprint, seen) <= self.duplicate_distance for seen in job["fingerprints"]):
+                    outcome = "duplicate"
+                else:
+                    job["fingerprints"].append(fingerprint)
+            metrics.inc("articles", result=outcome, cached="true" if art.get("cached") else "false")
+            if self.domain_stats is not None and art and not art.get("cached") and not art.get("skipped"):
+                self.domain_stats.record(
+                    job["urls"][url_index],
+                    outcome in ("success", "duplicate"),
+                    len(content),
+                    art.get("status_code"),
+                )
+            if outcome == "success":
+                job["found"][url_index] = {
+                    "url": art["url"],
+                    "title": art.get("title") or "",
+                    "content": content,
+                    "success": True,
+                }
+
+        def track(job_index: int, url_index: int, future: Future) -> None:
+            jobs[job_index]["in_flight"].add(future)
+            pending[future] = (job_index, url_index)
+
+        def fetch(job_index: int, url_index: int, url: str, validators: dict | None) -> None:
+            host = host_of(url)
+            future = self._executor.submit(self._fetch, url, validators)
+            # _fetch releases the host slot itself; a cancelled fetch never runs
+            future.add_done_callback(lambda f: self._domains.release(host) if f.cancelled() else None)
+            track(job_index, url_index, future)
+
+        def launch(job_index: int) -> None:
+            job = jobs[job_index]
+            deferred = []
+            while (
+                not satisfied(job)
+                and len(job["in_flight"]) < max_articles - len(job["found"])
+                and job["remaining"]
+            ):
+                url_index = job["remaining"].pop(0)
+                url = job["urls"][url_index]
+                if url_index not in job["checked"]:
+                    validators = None
+                    if self.cache is not None:
+                        cached = self.cache.get(url)
+                        if cached is not None:
+                            accept(job, url_index, cached)
+                            continue
+                        validators = self.cache.validators(url)
+                    job["checked"][url_index] = validators
+                if not self._domains.try_acquire(host_of(url)):
+                    deferred.append(url_index)
+                    continue
+                fetch(job_index, url_index, url, job["checked"].pop(url_index))
+            job["remaining"][:0] = deferred
+            if deferred and not satisfied(job):
+                blocked.add(job_index)
+            else:
+                blocked.discard(job_index)
+
+        for job_index in range(len(jobs)):
+            launch(job_index)
+            report(job_index)
+
+        while pending or blocked:
+            if pending:
+                done, _ = wait(
+                    pending,
+                    timeout=_DEFERRED_POLL_SECONDS if blocked else None,
+                    return_when=FIRST_COMPLETED,
+                )
+            else:
+                # Everything left waits on hosts busy with other collect() calls
+                self._domains.wait_for_release(_DEFERRED_POLL_SECONDS)
+                done = set()
+            for future in done:
+                job_index, url_index = pending.pop(future)
+                job = jobs[job_index]
+                job["in_flight"].discard(future)
+                if future.cancelled() or satisfied(job):
+                    report(job_index)
+                    continue
+                try:
+                    art = record_extraction(future.result())
+                except Exception:
+                    art = {}
+                url = job["urls"][url_index]
+                if art.get("not_modified"):
+                    refreshed = self.cache.refresh(url) if self.cache is not None else None
+                    if refreshed is None:
+                        # Evicted since its validators were read: fetch it again unconditionally
+                        job["checked"][url_index] = None
+                        job["remaining"].insert(0, url_index)
+                        launch(job_index)
+                        report(job_index)
+                        continue
+                    art = refreshed
+                elif "html" in art and not art.get("error"):
+                    # Downloaded: hand the HTML to the extractor processes
+                    page_validators[(job_index, url_index)] = {
+                        "etag": art.get("etag"),
+                        "last_modified": art.get("last_modified"),
+                    }
+                    track(
+                        job_index,
+                        url_index,
+                        self._extractors.submit(extract_from_html, art["url"], art["html"]),
+                    )
+                    continue
+                elif art and self.cache is not None and not art.get("circuit_open"):
+                    validators = page_validators.pop((job_index, url_index), None) or art
+                    self.cache.put(url, art, validators.get("etag"), validators.get("last_modified"))
+                accept(job, url_index, art)
+                if satisfied(job):
+                    for other in list(job["in_flight"]):
+                        if other.cancel():
+                            pending.pop(other, None)
+                            job["in_flight"].discard(other)
+                else:
+                    launch(job_index)
+                report(job_index)
+            for job_index in list(blocked):
+                launch(job_index)
+                report(job_index)
+
+        return [articles_of(job) for job in jobs]
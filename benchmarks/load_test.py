@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of run_scraper.main against the local mock server.
+Generates a synthetic country list (COUNTRIES x TRENDS), points Trends,
+DuckDuckGo and the n8n webhook at benchmarks/mock_server.py, runs the real
+pipeline (Chrome is still needed for the Trends pages) with throttles that only
+make sense against live sites turned off, and reports wall time, throughput,
+peak memory, the run's stage metrics and what the mock webhook received.
+Caches, state and the payload file go to a temporary directory.
+
+Usage (from the repo root):
+  python benchmarks/load_test.py --countries 100 --trends 50
+  python benchmarks/load_test.py --countries 20 --trends 20 --latency-ms 80 --error-rate 0.05 --pool-size 4
+  python benchmarks/load_test.py --pipeline-mode streaming --delivery-mode per_trend --json load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import MockServer, MockSettings  # noqa: E402
+
+
+def peak_rss_mb() -> dict[str, float] | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "largest_child": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--countries", type=int, default=10)
+    parser.add_argument("--trends", type=int, default=10, help="trends per country")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0)
+    parser.add_argument("--article-kb", type=float, default=8.0)
+    parser.add_argument("--pool-size", type=int, default=1, help="SCRAPER_POOL_SIZE")
+    parser.add_argument("--pipeline-mode", choices=("batch", "streaming"), default="batch")
+    parser.add_argument("--delivery-mode", choices=("payload", "per_trend"), default="payload")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    server = MockServer(
+        MockSettings(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            webhook_error_rate=args.webhook_error_rate,
+            trends_per_page=args.trends,
+            article_kb=args.article_kb,
+        )
+    )
+    server.start()
+    work_dir = tempfile.mkdtemp(prefix="trends-load-")
+    concurrency = os.environ.get("ARTICLE_FETCH_CONCURRENCY", "16")
+    os.environ.update(server.env())
+    os.environ.update({
+        "HEADLESS": "true",
+        "STATE_DIR": os.path.join(work_dir, "state"),
+        "CACHE_DIR": os.path.join(work_dir, "cache"),
+        "OUTPUT_DIR": work_dir,
+        "PIPELINE_MODE": args.pipeline_mode,
+        "DELIVERY_MODE": args.delivery_mode,
+        "SCRAPER_POOL_SIZE": str(args.pool_size),
+        "COUNTRY_DELAY_SECONDS": "0",
+        "TRENDS_REQUESTS_PER_MINUTE": "100000",
+        "SEARCH_MODE": "http",
+        "SEARCH_MIN_INTERVAL_SECONDS": "0",
+        # Every mock publisher is the same host: don't cap it, trip its breaker
+        # on injected errors or rank it against itself between runs
+        "ARTICLE_FETCH_PER_DOMAIN": concurrency,
+        "HOST_BREAKER_FAILURES": "1000000",
+        "DOMAIN_STATS": "false",
+        # Measure the pipeline itself, not the resume journal
+        "CHECKPOINTS": "false",
+        # Mock keywords are random word pairs; don't let them merge by chance
+        "TREND_CLUSTERING": "false",
+        "OUTBOX_BACKOFF_SECONDS": "0.5",
+        "INCREMENTAL": "false",
+        "RESUME": "false",
+        "OPENCLAW_WEBHOOK_URL": "",
+        "COUNTRIES": "",
+    })
+
+    import run_scraper
+    import trends_scraper
+
+    run_scraper.TREND_COUNTRIES = [
+        {"name": f"Load Country {i}", "geo": f"L{i:03d}"} for i in range(args.countries)
+    ]
+    trends_scraper.MAX_TRENDS_PER_COUNTRY = args.trends
+
+    print(
+        f"Load test: {args.countries} countries x {args.trends} trends against {server.base_url} "
+        f"({args.pipeline_mode} pipeline, {args.delivery_mode} delivery), work dir {work_dir}"
+    )
+    start = time.perf_counter()
+    try:
+        run_scraper.main()
+    finally:
+        elapsed = time.perf_counter() - start
+        stats = server.stats()
+        server.stop()
+
+    metrics_path = os.path.join(work_dir, "state", "metrics_google.json")
+    stage_seconds = {}
+    articles = 0
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding="utf-8") as f:
+            run_metrics = json.load(f)
+        stage_seconds = {
+            row["labels"]["stage"]: row["sum"] for row in run_metrics["timings"] if row["name"] == "stage_seconds"
+        }
+        articles = sum(
+            row["value"] for row in run_metrics["counters"]
+            if row["name"] == "articles" and row["labels"].get("result") == "success"
+        )
+    delivered = stats["webhooks"].get("n8n", {})
+    trends = args.countries * args.trends
+    report = {
+        "countries": args.countries,
+        "trends": trends,
+        "seconds": round(elapsed, 2),
+        "trends_per_sec": round(trends / elapsed, 2) if elapsed else None,
+        "articles": articles,
+        "articles_per_sec": round(articles / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stage_seconds": stage_seconds,
+        "mock_requests": stats["requests"],
+        "mock_errors": stats["errors"],
+        "n8n_received": delivered,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
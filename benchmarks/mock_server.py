@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for every remote the pipeline talks to, for offline load tests.
+One HTTP server answers:
+  /trending?geo=XX       synthetic Google Trends page (same table markup)
+  /html/?q=...           synthetic DuckDuckGo HTML results linking to /article/...
+  /article/<id>          synthetic publisher article of configurable size
+  /webhook/<name>        fake n8n/Open Claw webhook that records what it receives
+  /_stats                JSON counters: requests and errors per route, webhook bodies
+Latency, jitter, error rate and sizes are configurable; pages are generated
+deterministically from the request, so runs are repeatable.
+
+Point a run at it with:
+  TRENDS_BASE_URL=http://127.0.0.1:<port>/trending
+  DDG_HTML_URL=http://127.0.0.1:<port>/html/
+  N8N_WEBHOOK_URL=http://127.0.0.1:<port>/webhook/n8n
+
+Usage:
+  python benchmarks/mock_server.py --port 8765 --latency-ms 50 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+_WORDS = (
+    "storm market league election court energy vaccine launch festival transfer budget strike "
+    "merger outage verdict summit rally forecast recall tariff drought wildfire derby premiere"
+).split()
+
+_SENTENCES = (
+    "Officials said the situation was being monitored closely and further updates were expected later in the day.",
+    "Residents in the affected areas were advised to follow local guidance and check official channels.",
+    "Analysts cautioned that early figures could change as more complete information becomes available.",
+    "The announcement followed several weeks of speculation and drew strong reactions from both supporters and critics.",
+    "Organisers said preparations were on schedule despite the short notice and the unusually large turnout.",
+    "A spokesperson declined to comment on the details but confirmed that talks were continuing.",
+)
+
+
+@dataclass
+class MockSettings:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    webhook_error_rate: float = 0.0
+    trends_per_page: int = 20
+    ddg_results: int = 10
+    article_kb: float = 8.0
+    seed: int = 1
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """Don't print a traceback each time a client drops a keep-alive connection."""
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockServer:
+    """Threaded mock server; start() returns the base URL, stats() the counters."""
+
+    def __init__(self, settings: MockSettings | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or MockSettings()
+        self._lock = threading.Lock()
+        self._random = random.Random(self.settings.seed)
+        self._stats: dict[str, Any] = {"requests": {}, "errors": {}, "webhooks": {}}
+        self._server = _QuietServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        threading.Thread(target=self._server.serve_forever, name="mock-server", daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def env(self) -> dict[str, str]:
+        """Environment overrides that point the pipeline at this server."""
+        return {
+            "TRENDS_BASE_URL": f"{self.base_url}/trending",
+            "DDG_HTML_URL": f"{self.base_url}/html/",
+            "N8N_WEBHOOK_URL": f"{self.base_url}/webhook/n8n",
+        }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    # --- bookkeeping -----------------------------------------------------
+
+    def _count(self, section: str, route: str, amount: int = 1) -> None:
+        with self._lock:
+            bucket = self._stats[section]
+            bucket[route] = bucket.get(route, 0) + amount
+
+    def _record_webhook(self, name: str, body: bytes, encoding: str | None) -> None:
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = {}
+        trends = sum(len(c.get("trends") or []) for c in payload.get("countries") or [])
+        with self._lock:
+            hook = self._stats["webhooks"].setdefault(name, {"calls": 0, "bytes": 0, "trends": 0})
+            hook["calls"] += 1
+            hook["bytes"] += len(body)
+            hook["trends"] += trends
+
+    def _delay_and_fail(self, error_rate: float) -> bool:
+        """Sleep the configured latency; True if this request should fail."""
+        s = self.settings
+        with self._lock:
+            delay = max(s.latency_ms + self._random.uniform(-s.jitter_ms, s.jitter_ms), 0) / 1000
+            fail = self._random.random() < error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    # --- pages -----------------------------------------------------------
+
+    def trends_page(self, geo: str) -> str:
+        rng = random.Random(f"{self.settings.seed}:{geo}")
+        rows = []
+        for i in range(self.settings.trends_per_page):
+            keyword = f"{geo.lower()} {' '.join(rng.sample(_WORDS, 2))} {i}"
+            volume = rng.choice(("10K+", "20K+", "50K+", "100K+", "200K+", "500K+"))
+            rows.append(
+                f'<tr role="row"><td><div role="checkbox"></div></td>'
+                f'<td><div class="mZ3RIc">{keyword}</div></td>'
+                f"<td><div>{volume}</div></td><td><div>{rng.randint(1, 4)} hours ago</div></td>"
+                f'<td><button aria-label="breakdown">{keyword}</button></td></tr>'
+            )
+        return (
+            "<!doctype html><html><head><meta charset='utf-8'><title>Trending now - Google Trends</title></head>"
+            "<body><main><h1>Trending now</h1><table role='grid'><thead><tr><th></th><th>Trends</th>"
+            "<th>Search volume</th><th>Started</th><th>Trend breakdown</th></tr></thead><tbody>"
+            + "".join(rows)
+            + "</tbody></table></main></body></html>"
+        )
+
+    def ddg_page(self, query: str) -> str:
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:10]
+        results = []
+        for i in range(self.settings.ddg_results):
+            target = f"{self.base_url}/article/{digest}-{i}"
+            encoded = urllib.parse.quote(target, safe="")
+            results.append(
+                '<div class="result results_links web-result"><div class="links_main result__body">'
+                f'<h2 class="result__title"><a rel="nofollow" class="result__a" '
+                f'href="//duckduckgo.com/l/?uddg={encoded}&amp;rut={digest}">{query} result {i + 1}</a></h2>'
+                f'<a class="result__snippet" href="//duckduckgo.com/l/?uddg={encoded}&amp;rut={digest}">'
+                f"Coverage of {query}.</a></div></div>"
+            )
+        return (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'><title>DuckDuckGo</title></head>"
+            f"<body class='body--html'><div id='links' class='results'>{''.join(results)}</div></body></html>"
+        )
+
+    def article_page(self, article_id: str) -> str:
+        rng = random.Random(f"{self.settings.seed}:{article_id}")
+        target = int(self.settings.article_kb * 1024)
+        paragraphs = []
+        size = 0
+        while size < target:
+            # Stock sentences plus generated ones, so different articles are not near-duplicates
+            detail = " ".join(f"{w} {rng.randint(2, 9999)}" for w in rng.sample(_WORDS, 8))
+            paragraph = f"{rng.choice(_SENTENCES)} Figures cited: {detail}. {rng.choice(_SENTENCES)}"
+            paragraphs.append(f"<p>{paragraph}</p>")
+            size += len(paragraph) + 7
+        title = f"Report {article_id}: {' '.join(rng.sample(_WORDS, 3))}"
+        nav = "".join(f'<li><a href="/section/{w}">{w.title()}</a></li>' for w in _WORDS[:12])
+        return (
+            f"<!doctype html><html lang='en'><head><meta charset='utf-8'><title>{title}</title></head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header><main><article><h1>{title}</h1>"
+            f"{''.join(paragraphs)}</article></main>"
+            "<footer><a href='/privacy'>Privacy</a> <a href='/terms'>Terms</a></footer></body></html>"
+        )
+
+    # --- HTTP ------------------------------------------------------------
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                parts = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(parts.query)
+                route = parts.path.strip("/").split("/")[0] or "/"
+                mock._count("requests", route)
+                if route == "_stats":
+                    self._send(200, json.dumps(mock.stats()), "application/json")
+                    return
+                if route not in ("trending", "html", "article"):
+                    self._send(404, "not found", "text/plain")
+                    return
+                if mock._delay_and_fail(mock.settings.error_rate):
+                    mock._count("errors", route)
+                    self._send(503, "mock error", "text/plain")
+                    return
+                if route == "trending":
+                    self._send(200, mock.trends_page((query.get("geo") or ["US"])[0]))
+                elif route == "html":
+                    self._send(200, mock.ddg_page((query.get("q") or [""])[0]))
+                else:
+                    self._send(200, mock.article_page(parts.path.rsplit("/", 1)[-1]))
+
+            def do_POST(self) -> None:
+                parts = urllib.parse.urlsplit(self.path)
+                route = parts.path.strip("/").split("/")[0]
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if route == "html":
+                    # DDG's HTML endpoint also accepts form posts
+                    form = urllib.parse.parse_qs(body.decode("utf-8", "replace"))
+                    mock._count("requests", route)
+                    self._send(200, mock.ddg_page((form.get("q") or [""])[0]))
+                    return
+                if route != "webhook":
+                    self._send(404, "not found", "text/plain")
+                    return
+                name = parts.path.strip("/").split("/", 1)[-1] or "default"
+                mock._count("requests", f"webhook/{name}")
+                if mock._delay_and_fail(mock.settings.webhook_error_rate):
+                    mock._count("errors", f"webhook/{name}")
+                    self._send(500, "mock webhook error", "text/plain")
+                    return
+                mock._record_webhook(name, body, self.headers.get("Content-Encoding"))
+                self._send(200, json.dumps({"ok": True}), "application/json")
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every GET and webhook call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of Trends/DDG/article requests answered 503")
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0)
+    parser.add_argument("--trends-per-page", type=int, default=20)
+    parser.add_argument("--ddg-results", type=int, default=10)
+    parser.add_argument("--article-kb", type=float, default=8.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = MockServer(
+        MockSettings(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            webhook_error_rate=args.webhook_error_rate,
+            trends_per_page=args.trends_per_page,
+            ddg_results=args.ddg_results,
+            article_kb=args.article_kb,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+    )
+    server.start()
+    print(f"Mock server on {server.base_url}")
+    for key, value in server.env().items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the scrape, search-parse and extraction hot paths.
+Everything runs against the saved pages in benchmarks/fixtures, served from a
+local HTTP server, so results are comparable between runs on a box without
+network access.
+
+Usage (from the repo root):
+  python benchmarks/run_benchmarks.py
+  python benchmarks/run_benchmarks.py --only ddg,extract --iterations 200
+  python benchmarks/run_benchmarks.py --json bench.json
+
+Benchmarks:
+  trends   scrape_country_trends against the saved Trends page (needs Chrome;
+           skipped if no driver can be started)
+  ddg      _extract_uddg_urls on a saved DuckDuckGo result page
+  extract  extract_from_html on saved articles (CPU only), then
+           extract_article_content end to end over local HTTP
+
+Each benchmark reports docs/sec, p50/p95 latency and the process's peak RSS
+after it ran (peak RSS only grows, so run one benchmark for a clean figure).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(name: str, fn: Callable[[], Any], iterations: int, warmup: int = 1) -> dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "name": name,
+        "docs": iterations,
+        "seconds": round(elapsed, 4),
+        "docs_per_sec": round(iterations / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)] * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves fixtures; /trending (any query string) is the saved Trends page."""
+
+    def translate_path(self, path: str) -> str:
+        if path.split("?", 1)[0] == "/trending":
+            path = "/trends_US.html"
+        return super().translate_path(path)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_FixtureHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _article_names() -> list[str]:
+    return sorted(os.listdir(os.path.join(FIXTURES, "articles")))
+
+
+def bench_ddg(iterations: int, base_url: str) -> list[dict[str, Any]]:
+    from google_search import _extract_uddg_urls
+
+    html = _read("ddg_results.html")
+    return [measure("ddg: _extract_uddg_urls", lambda: _extract_uddg_urls(html, 8), iterations)]
+
+
+def bench_extract(iterations: int, base_url: str) -> list[dict[str, Any]]:
+    import requests
+
+    from article_extractor import extract_article_content, extract_from_html
+
+    pages = [(name, _read(os.path.join("articles", name))) for name in _article_names()]
+    cycle = {"i": 0}
+
+    def next_page() -> tuple[str, str]:
+        cycle["i"] += 1
+        return pages[cycle["i"] % len(pages)]
+
+    def extract_only() -> None:
+        name, html = next_page()
+        if not extract_from_html(f"{base_url}/articles/{name}", html)["success"]:
+            raise RuntimeError(f"extraction failed for fixture {name}")
+
+    session = requests.Session()
+
+    def fetch_and_extract() -> None:
+        name, _ = next_page()
+        if not extract_article_content(f"{base_url}/articles/{name}", session)["success"]:
+            raise RuntimeError(f"fetch/extract failed for fixture {name}")
+
+    results = [
+        measure("extract: extract_from_html", extract_only, iterations),
+        measure("extract: extract_article_content (local HTTP)", fetch_and_extract, iterations),
+    ]
+    session.close()
+    return results
+
+
+def bench_trends(iterations: int, base_url: str) -> list[dict[str, Any]]:
+    import trends_scraper
+
+    try:
+        driver = trends_scraper.create_driver(headless=True)
+    except Exception as e:
+        print(f"trends: skipped, no Chrome driver ({str(e).splitlines()[0] if str(e) else type(e).__name__})")
+        return []
+    os.environ["TRENDS_BASE_URL"] = f"{base_url}/trending"
+    country = {"name": "United States", "geo": "US"}
+
+    def scrape() -> None:
+        if not trends_scraper.scrape_country_trends(driver, country):
+            raise RuntimeError("no trends scraped from the fixture page")
+
+    try:
+        # Page loads are slow; a tenth of the iterations is plenty
+        return [measure("trends: scrape_country_trends", scrape, max(iterations // 10, 3))]
+    finally:
+        driver.quit()
+
+
+BENCHMARKS = {"trends": bench_trends, "ddg": bench_ddg, "extract": bench_extract}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    server = start_fixture_server()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    results = []
+    try:
+        for name in selected:
+            results.extend(BENCHMARKS[name](args.iterations, base_url))
+    finally:
+        server.shutdown()
+
+    print(f"{'benchmark':<48} {'docs':>6} {'docs/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS MB':>12}")
+    for row in results:
+        print(
+            f"{row['name']:<48} {row['docs']:>6} {row['docs_per_sec']:>9} "
+            f"{row['p50_ms']:>9} {row['p95_ms']:>9} {str(row['peak_rss_mb']):>12}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Small pool of Selenium drivers so several pages can be loaded concurrently,
+and kept warm across stages and worker runs.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+
+class DriverPool:
+    """
+    Lend out up to `size` drivers built by `factory`. Drivers are created
+    lazily on first use and reused until close(). If `reset` is given it runs
+    on every reused driver before it is lent out; a driver whose reset fails
+    (e.g. the browser died) is discarded and replaced.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        factory: Callable[[], Any],
+        reset: Callable[[Any], None] | None = None,
+    ):
+        self.size = max(int(size), 1)
+        self._factory = factory
+        self._reset = reset
+        self._idle: queue.Queue = queue.Queue()
+        self._all: list[Any] = []
+        # Slots reserved by callers that are still starting their browser
+        self._starting = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Any:
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    reserved = len(self._all) + self._starting < self.size
+                    if reserved:
+                        self._starting += 1
+                if reserved:
+                    # Cold start outside the lock so browsers start in parallel
+                    try:
+                        driver = self._factory()
+                    except BaseException:
+                        with self._lock:
+                            self._starting -= 1
+                        # Wake one waiter so it can take the freed slot
+                        self._idle.put(None)
+                        raise
+                    with self._lock:
+                        self._starting -= 1
+                        self._all.append(driver)
+                    return driver
+                driver = self._idle.get()
+            if driver is None:
+                continue
+            if self._reset is None:
+                return driver
+            try:
+                self._reset(driver)
+                return driver
+            except Exception as e:
+                print(f"Discarding broken browser from pool: {e}")
+                self._discard(driver)
+
+    def _discard(self, driver: Any) -> None:
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self) -> Iterator[Any]:
+        """Borrow a driver for the duration of the with-block."""
+        driver = self._acquire()
+        try:
+            yield driver
+        finally:
+            self._idle.put(driver)
+
+    def close(self) -> None:
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._idle = queue.Queue()
+
+
+@contextmanager
+def lease_driver(pool: DriverPool | None, factory: Callable[[], Any]) -> Iterator[Any]:
+    """Borrow from `pool` when given, else build a one-off driver and quit it afterwards."""
+    if pool is not None:
+        with pool.driver() as driver:
+            yield driver
+        return
+    driver = factory()
+    try:
+        yield driver
+    finally:
+        driver.quit()
@@ -0,0 +1,129 @@
+"""
+Per-stage checkpoints so a crashed or timed-out run can resume.
+Completed units (scraped countries, resolved URL lists, extracted articles) are
+appended to a journal (one JSON line per unit) as they finish, so saving costs
+the size of the unit rather than of the whole checkpoint. A run started with
+RESUME=true replays the journal, ignoring a line torn by a crash, and picks up
+from there instead of redoing browser and network work. The checkpoint is
+cleared once the payload is saved and queued for delivery.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any
+
+from config import CHECKPOINT_MAX_AGE_HOURS
+from run_state import state_dir
+from search_cache import normalize_keyword
+
+
+def trend_key(geo: str, keyword: str) -> str:
+    return f"{geo}|{normalize_keyword(keyword)}"
+
+
+def resume_enabled() -> bool:
+    return os.environ.get("RESUME", "false").strip().lower() == "true"
+
+
+def checkpoints_enabled() -> bool:
+    return os.environ.get("CHECKPOINTS", "true").strip().lower() == "true"
+
+
+class Checkpoint:
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = self._empty()
+        if resume and self._load():
+            self._journal = open(self.path, "a", encoding="utf-8")
+            if self._torn:
+                # Start on a fresh line after the torn one
+                self._journal.write("\n")
+        else:
+            self._journal = open(self.path, "w", encoding="utf-8")
+            self._append({"started_at": self.data["started_at"]})
+
+    @staticmethod
+    def _empty() -> dict[str, Any]:
+        return {"started_at": time.time(), "countries": {}, "urls": {}, "articles": {}}
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                line = f.readline()
+                header = json.loads(line)
+                max_age = 3600 * float(os.environ.get("CHECKPOINT_MAX_AGE_HOURS", CHECKPOINT_MAX_AGE_HOURS))
+                if time.time() - header.get("started_at", 0) > max_age:
+                    print(f"Ignoring checkpoint older than {max_age / 3600:g}h: {self.path}")
+                    return False
+                self.data["started_at"] = header["started_at"]
+                for line in f:
+                    try:
+                        unit = json.loads(line)
+                    except ValueError:
+                        # Torn last write from a crash
+                        continue
+                    self.data[unit["section"]][unit["key"]] = unit["value"]
+                self._torn = not line.endswith("\n")
+        except (OSError, ValueError, KeyError):
+            self.data = self._empty()
+            return False
+        print(
+            f"Resuming from checkpoint: {len(self.data['countries'])} countries scraped, "
+            f"{len(self.data['urls'])} trends searched, {len(self.data['articles'])} trends fetched."
+        )
+        return True
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        # Flushed per unit so a killed run loses at most the unit being written
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def _get(self, section: str, key: str) -> Any:
+        # Copies in and out: callers keep mutating trend dicts after saving them
+        with self._lock:
+            return copy.deepcopy(self.data[section].get(key))
+
+    def _set(self, section: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.data[section][key] = copy.deepcopy(value)
+            if self._journal is not None:
+                self._append({"section": section, "key": key, "value": value})
+
+    def country(self, geo: str) -> dict[str, Any] | None:
+        return self._get("countries", geo)
+
+    def save_country(self, country_data: dict[str, Any]) -> None:
+        self._set("countries", country_data["geo"], country_data)
+
+    def urls(self, geo: str, keyword: str) -> list[str] | None:
+        return self._get("urls", trend_key(geo, keyword))
+
+    def save_urls(self, geo: str, keyword: str, urls: list[str]) -> None:
+        self._set("urls", trend_key(geo, keyword), urls)
+
+    def articles(self, geo: str, keyword: str) -> list[dict[str, Any]] | None:
+        return self._get("articles", trend_key(geo, keyword))
+
+    def save_articles(self, geo: str, keyword: str, articles: list[dict[str, Any]]) -> None:
+        self._set("articles", trend_key(geo, keyword), articles)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def open_checkpoint(source_slug: str) -> Checkpoint | None:
+    """Checkpoint for this source's runner, loaded when RESUME=true; None if CHECKPOINTS=false."""
+    if not checkpoints_enabled():
+        return None
+    return Checkpoint(os.path.join(state_dir(), f"checkpoint_{source_slug}.jsonl"), resume=resume_enabled())
@@ -18,6 +18,12 @@ TREND_COUNTRIES = [
 TRENDS_BASE_URL = "https://trends.google.com/trending"
 TRENDS_HOURS = 4
 
+# How trends are read from the page:
+#   "dom"     - walk the rendered table
+#   "network" - parse the page's batchexecute XHR from Chrome's performance log
+#               (adds search volume, start time and breakdown; falls back to DOM)
+TRENDS_EXTRACTION_MODE = "dom"
+
 # Max trends to process per country (to avoid rate limits)
 MAX_TRENDS_PER_COUNTRY = 10
 
@@ -33,6 +39,111 @@ MIN_ARTICLE_CONTENT_LENGTH = 150
 # Request timeout for fetching article content (seconds)
 ARTICLE_REQUEST_TIMEOUT = 15
 
+# Publisher hosts: after HOST_BREAKER_FAILURES timeouts/errors in a row a host is
+# skipped for HOST_BREAKER_COOLDOWN_SECONDS (doubling while it keeps failing).
+# Request timeouts shrink to ADAPTIVE_TIMEOUT_MULTIPLIER x the host's p95 response
+# time, never below ADAPTIVE_TIMEOUT_MIN_SECONDS or above ARTICLE_REQUEST_TIMEOUT.
+HOST_BREAKER_FAILURES = 5
+HOST_BREAKER_COOLDOWN_SECONDS = 300
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3
+ADAPTIVE_TIMEOUT_MIN_SECONDS = 3
+
+# Article downloads are streamed: responses that are not HTML are dropped after
+# the headers, and at most this many bytes of a page are read (the rest is cut off).
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024
+
+# Ceiling (seconds) for condition-based page waits after driver.get; pages usually
+# become ready well before this, so no fixed sleep is paid.
+PAGE_WAIT_TIMEOUT_SECONDS = 10
+PAGE_WAIT_POLL_SECONDS = 0.1
+
+# Minimum spacing between DuckDuckGo searches (seconds). Time spent loading the
+# previous result page counts toward it.
+SEARCH_MIN_INTERVAL_SECONDS = 0.8
+
+# Concurrent article fetching in the enrichment stage: total fetches in flight,
+# and in flight per publisher domain.
+ARTICLE_FETCH_CONCURRENCY = 16
+ARTICLE_FETCH_PER_DOMAIN = 4
+
+# Articles of one trend whose content SimHashes (64 bits) differ in at most this
+# many bits are copies of the same story; only the first is kept. -1 keeps them all.
+ARTICLE_DUPLICATE_DISTANCE = 6
+
+# Per-publisher stats (STATE_DIR/domain_stats.sqlite3) order each trend's
+# candidate URLs, best domain first. A domain with at least
+# DOMAIN_DEMOTE_MIN_ATTEMPTS fetches and a success rate at or below
+# DOMAIN_DEMOTE_MAX_SUCCESS_RATE is tried last. Counts halve every
+# DOMAIN_STATS_HALF_LIFE_DAYS so demoted domains get another chance.
+DOMAIN_DEMOTE_MIN_ATTEMPTS = 8
+DOMAIN_DEMOTE_MAX_SUCCESS_RATE = 0.15
+DOMAIN_STATS_HALF_LIFE_DAYS = 7
+
+# Processes running trafilatura extraction on downloaded HTML (0 = extract inline
+# on the fetching threads).
+ARTICLE_EXTRACTION_WORKERS = 2
+
+# On-disk caches (SQLite) live here; relative paths are resolved next to this file.
+CACHE_DIR = ".cache"
+
+# Extracted-article cache keyed by canonical URL. Failures/empty pages are cached
+# for the shorter negative TTL. Least recently used entries are dropped past the size cap.
+ARTICLE_CACHE_TTL_SECONDS = 24 * 3600
+ARTICLE_CACHE_NEGATIVE_TTL_SECONDS = 2 * 3600
+ARTICLE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Expired entries with ETag/Last-Modified are kept this long for conditional refetches.
+ARTICLE_CACHE_STALE_SECONDS = 7 * 24 * 3600
+
+# How DuckDuckGo is queried:
+#   "tiered"  - pooled HTTP session first, browser only when DDG serves its minimal page
+#   "browser" - always load results in Selenium
+#   "http"    - never start a browser for search
+SEARCH_MODE = "tiered"
+
+# Keyword -> search result URLs are reused across runs for this long.
+SEARCH_CACHE_TTL_SECONDS = 6 * 3600
+
+# Streaming pipeline (PIPELINE_MODE=streaming): capacity of the queues between
+# stages, and trends being fetched/extracted at once.
+PIPELINE_QUEUE_SIZE = 20
+PIPELINE_FETCH_WORKERS = 4
+
+# Trends whose keywords share at least this much of their words (Jaccard, after
+# folding case/accents and dropping filler words) are enriched once per run and
+# get the same articles; numbers, and every word of keywords up to four words
+# long, must match. TREND_CLUSTERING=false turns this off.
+TREND_CLUSTER_THRESHOLD = 0.6
+
+# Run state that must survive between runs (incremental runs, checkpoints).
+STATE_DIR = ".state"
+
+# Incremental runs (INCREMENTAL=true): a trend already sent for a country within
+# this many hours is skipped unless its source links articles not sent before.
+INCREMENTAL_WINDOW_HOURS = 48
+
+# Checkpoints (STATE_DIR/checkpoint_<source>.jsonl) older than this are not resumed.
+CHECKPOINT_MAX_AGE_HOURS = 12
+
+# n8n delivery: request body encoding ("none", "gzip" or "deflate") and the
+# largest uncompressed JSON body per request. Bigger payloads are split into
+# batches by country, then by trend. 0 sends everything in one request.
+N8N_COMPRESSION = "none"
+N8N_MAX_BODY_BYTES = 4 * 1024 * 1024
+
+# "payload" sends one payload per run; "per_trend" sends each trend to n8n as
+# its own payload as soon as it is enriched, N8N_TREND_CONCURRENCY at a time.
+DELIVERY_MODE = "payload"
+N8N_TREND_CONCURRENCY = 4
+
+# Webhook outbox (STATE_DIR/outbox.sqlite3): deliveries sent at once, attempts
+# made within a run before leaving the rest to the worker's next drain, and
+# exponential backoff between attempts. A delivery is dropped after OUTBOX_MAX_ATTEMPTS.
+OUTBOX_WORKERS = 4
+OUTBOX_RUN_ATTEMPTS = 3
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+
 # Request timeout for API-based trend sources (seconds)
 API_REQUEST_TIMEOUT = 20
 
@@ -40,6 +151,13 @@ API_REQUEST_TIMEOUT = 20
 # Default: 10 minutes to reduce rate-limit pressure.
 COUNTRY_DELAY_SECONDS = 600
 
+# Number of Chrome drivers scraping countries concurrently.
+# 1 keeps the sequential mode above (one driver, COUNTRY_DELAY_SECONDS between countries).
+SCRAPER_POOL_SIZE = 1
+
+# Pooled mode: request budget for the Trends host, shared by all drivers.
+TRENDS_REQUESTS_PER_MINUTE = 4
+
 # Max trends to process per country from API sources
 MAX_X_TRENDS_PER_COUNTRY = 5
 MAX_NEWSAPI_TRENDS_PER_COUNTRY = 5
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Per-publisher fetch statistics that persist between runs.
+For every domain the enrichment stage records how often its pages gave usable
+content, how long downloads took, how much text came back and how often it
+answered 401/402/403 (paywalls and bot walls). Candidate URLs are then tried
+most productive domain first, and domains that chronically fail are moved to
+the back of the list. Counts decay with a half-life so a domain can recover.
+Stored in STATE_DIR/domain_stats.sqlite3; writes are batched until close().
+
+Usage:
+  python domain_stats.py    Print the stored domains, best first.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any
+
+from config import (
+    ARTICLE_REQUEST_TIMEOUT,
+    DOMAIN_DEMOTE_MAX_SUCCESS_RATE,
+    DOMAIN_DEMOTE_MIN_ATTEMPTS,
+    DOMAIN_STATS_HALF_LIFE_DAYS,
+)
+from host_limits import host_of
+from run_state import state_dir
+
+# Recent samples kept per domain for the latency and content-length medians
+_SAMPLES = 50
+_PAYWALL_STATUSES = (401, 402, 403)
+
+
+def domain_stats_enabled() -> bool:
+    return os.environ.get("DOMAIN_STATS", "true").strip().lower() == "true"
+
+
+class DomainStats:
+    """Thread-safe in-memory view of the domain table, flushed to SQLite on close()."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.path.join(state_dir(), "domain_stats.sqlite3")
+        self.half_life = 86400 * float(os.environ.get("DOMAIN_STATS_HALF_LIFE_DAYS", str(DOMAIN_STATS_HALF_LIFE_DAYS)))
+        self.demote_min_attempts = float(
+            os.environ.get("DOMAIN_DEMOTE_MIN_ATTEMPTS", str(DOMAIN_DEMOTE_MIN_ATTEMPTS))
+        )
+        self.demote_max_success = float(
+            os.environ.get("DOMAIN_DEMOTE_MAX_SUCCESS_RATE", str(DOMAIN_DEMOTE_MAX_SUCCESS_RATE))
+        )
+        self._lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                attempts REAL NOT NULL,
+                successes REAL NOT NULL,
+                paywalls REAL NOT NULL,
+                latencies TEXT NOT NULL,
+                lengths TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._domains: dict[str, dict[str, Any]] = {}
+        for domain, attempts, successes, paywalls, latencies, lengths, updated_at in self._conn.execute(
+            "SELECT domain, attempts, successes, paywalls, latencies, lengths, updated_at FROM domains"
+        ):
+            self._domains[domain] = {
+                "attempts": attempts,
+                "successes": successes,
+                "paywalls": paywalls,
+                "latencies": json.loads(latencies),
+                "lengths": json.loads(lengths),
+                "updated_at": updated_at,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            rows = [
+                (
+                    domain,
+                    row["attempts"],
+                    row["successes"],
+                    row["paywalls"],
+                    json.dumps(row["latencies"]),
+                    json.dumps(row["lengths"]),
+                    row["updated_at"],
+                )
+                for domain, row in ((d, self._domains[d]) for d in self._dirty)
+            ]
+            self._dirty.clear()
+            if rows:
+                self._conn.executemany("INSERT OR REPLACE INTO domains VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self) -> "DomainStats":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _row(self, domain: str, now: float) -> dict[str, Any]:
+        """The domain's row with its counts decayed to `now`; caller holds the lock."""
+        row = self._domains.setdefault(
+            domain,
+            {"attempts": 0.0, "successes": 0.0, "paywalls": 0.0, "latencies": [], "lengths": [], "updated_at": now},
+        )
+        if self.half_life > 0 and now > row["updated_at"]:
+            factor = 0.5 ** ((now - row["updated_at"]) / self.half_life)
+            for field in ("attempts", "successes", "paywalls"):
+                row[field] *= factor
+        row["updated_at"] = now
+        return row
+
+    def record_latency(self, url: str, seconds: float) -> None:
+        domain = host_of(url)
+        with self._lock:
+            samples = self._row(domain, time.time())["latencies"]
+            samples.append(round(seconds, 3))
+            del samples[:-_SAMPLES]
+            self._dirty.add(domain)
+
+    def record(self, url: str, usable: bool, content_length: int = 0, status_code: int | None = None) -> None:
+        """Count one fetched page: whether it had usable content, its text length and HTTP status."""
+        domain = host_of(url)
+        with self._lock:
+            row = self._row(domain, time.time())
+            row["attempts"] += 1
+            row["successes"] += 1 if usable else 0
+            row["paywalls"] += 1 if status_code in _PAYWALL_STATUSES else 0
+            if status_code is None or status_code < 400:
+                row["lengths"].append(content_length)
+                del row["lengths"][:-_SAMPLES]
+            self._dirty.add(domain)
+
+    def _score(self, row: dict[str, Any] | None) -> tuple[bool, float]:
+        """(demoted, expected usable articles per fetch discounted for slow downloads)."""
+        if row is None:
+            return False, 0.5
+        age = max(time.time() - row["updated_at"], 0)
+        factor = 0.5 ** (age / self.half_life) if self.half_life > 0 else 1.0
+        attempts, successes = row["attempts"] * factor, row["successes"] * factor
+        rate = (successes + 1) / (attempts + 2)
+        demoted = attempts >= self.demote_min_attempts and rate <= self.demote_max_success
+        latency = statistics.median(row["latencies"]) if row["latencies"] else 0.0
+        return demoted, rate / (1 + latency / ARTICLE_REQUEST_TIMEOUT)
+
+    def order(self, urls: list[str]) -> list[str]:
+        """URLs with the most productive domains first and demoted ones last; ties keep their order."""
+        with self._lock:
+            scores = {domain: self._score(self._domains.get(domain)) for domain in {host_of(u) for u in urls}}
+        return sorted(urls, key=lambda u: (scores[host_of(u)][0], -scores[host_of(u)][1]))
+
+    def summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = []
+            for domain, row in self._domains.items():
+                demoted, score = self._score(row)
+                rows.append({
+                    "domain": domain,
+                    "attempts": round(row["attempts"], 1),
+                    "success_rate": round(row["successes"] / row["attempts"], 2) if row["attempts"] else None,
+                    "paywalls": round(row["paywalls"], 1),
+                    "median_seconds": statistics.median(row["latencies"]) if row["latencies"] else None,
+                    "median_length": statistics.median(row["lengths"]) if row["lengths"] else None,
+                    "score": round(score, 3),
+                    "demoted": demoted,
+                })
+        return sorted(rows, key=lambda r: (r["demoted"], -r["score"]))
+
+
+def main() -> None:
+    with DomainStats() as stats:
+        rows = stats.summary()
+    print(f"{'domain':<40} {'tries':>6} {'ok %':>5} {'paywall':>7} {'p50 s':>6} {'p50 chars':>9}  score")
+    for r in rows:
+        rate = "-" if r["success_rate"] is None else f"{r['success_rate'] * 100:.0f}"
+        print(
+            f"{r['domain'][:40]:<40} {r['attempts']:>6} {rate:>5} {r['paywalls']:>7} "
+            f"{str(r['median_seconds'] or '-'):>6} {str(r['median_length'] or '-'):>9}  "
+            f"{r['score']}{' (demoted)' if r['demoted'] else ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,40 @@
 """
 Get top search result URLs for a query (used to find articles for each trend).
-Uses DuckDuckGo HTML via Selenium (DDG serves full results to browsers, minimal to plain requests).
+Uses DuckDuckGo HTML. DDG often serves full results to browsers and a minimal
+page to plain requests, so search_news_urls tries a pooled HTTP session first
+and only escalates to Selenium when it detects the minimal/blocked page.
 """
 
+import os
 import re
-import time
+import threading
 import urllib.parse
+from typing import Any, Callable
+
+import requests
+
+from config import SEARCH_MODE, USER_AGENT
+from page_waits import wait_for_ddg_results
+
+DDG_HTML_URL = "https://html.duckduckgo.com/html/"
+
+# Headers a desktop Chrome sends for a top-level navigation
+BROWSER_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://html.duckduckgo.com/",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+}
+
+# Markers of DDG's bot-check / rate-limit pages
+_BLOCKED_MARKERS = ("anomaly-modal", "challenge-form", "If this error persists")
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
 
 
 # Domains to skip (not article content; often empty or corporate homepages)
@@ -45,6 +74,66 @@ def _extract_uddg_urls(html: str, count: int) -> list[str]:
     return urls[:count]
 
 
+def ddg_html_url() -> str:
+    """DuckDuckGo HTML endpoint; DDG_HTML_URL can point it at a local stand-in."""
+    return (os.environ.get("DDG_HTML_URL") or DDG_HTML_URL).strip()
+
+
+def _news_query_url(query: str) -> str:
+    # Add " news" to get recent/news results instead of generic or corporate homepages
+    search_query = f"{query} news" if query.strip() else query
+    return ddg_html_url() + "?q=" + urllib.parse.quote(search_query)
+
+
+def _http_session() -> requests.Session:
+    """Process-wide keep-alive session for DDG, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(BROWSER_HEADERS)
+        return _session
+
+
+def is_minimal_page(html: str) -> bool:
+    """True when DDG returned its bot-check page or a page without any result markup."""
+    if any(marker in html for marker in _BLOCKED_MARKERS):
+        return True
+    return "result__" not in html and "no-results" not in html
+
+
+def search_via_http(query: str, count: int = 2) -> list[str] | None:
+    """
+    Search over the pooled HTTP session. Returns None when DDG served the
+    minimal/blocked page (the query should be escalated to a browser).
+    """
+    try:
+        r = _http_session().get(_news_query_url(query), timeout=15)
+        if r.status_code in (202, 403, 429) or not r.ok:
+            return None
+        if is_minimal_page(r.text):
+            return None
+        return _extract_uddg_urls(r.text, count)
+    except Exception as e:
+        print(f"  DuckDuckGo (http) failed for \"{query[:40]}...\": {e}")
+    return None
+
+
+def search_news_urls(query: str, count: int, get_driver: Callable[[], Any]) -> tuple[list[str], str]:
+    """
+    Tiered search: lightweight HTTP first, Selenium only if the HTTP tier got
+    the minimal page. SEARCH_MODE=browser or http pins a single tier.
+    `get_driver` is called only when a browser is actually needed.
+    Returns (urls, tier used).
+    """
+    mode = (os.environ.get("SEARCH_MODE") or SEARCH_MODE).strip().lower()
+    if mode != "browser":
+        urls = search_via_http(query, count)
+        if urls is not None or mode == "http":
+            return urls or [], "http"
+    return get_top_search_urls(get_driver(), query, count), "browser"
+
+
 def get_top_search_urls(driver, query: str, count: int = 2) -> list[str]:
     """
     Load DuckDuckGo HTML search in the given driver and return top `count` result URLs.
@@ -53,11 +142,8 @@ def get_top_search_urls(driver, query: str, count: int = 2) -> list[str]:
     """
     urls = []
     try:
-        # Add " news" to get recent/news results instead of generic or corporate homepages
-        search_query = f"{query} news" if query.strip() else query
-        url = "https://html.duckduckgo.com/html/?q=" + urllib.parse.quote(search_query)
-        driver.get(url)
-        time.sleep(2)
+        driver.get(_news_query_url(query))
+        wait_for_ddg_results(driver)
         html = driver.page_source
         urls = _extract_uddg_urls(html, count)
     except Exception as e:
@@ -67,18 +153,7 @@ def get_top_search_urls(driver, query: str, count: int = 2) -> list[str]:
 
 def get_top_search_urls_duckduckgo(query: str, count: int = 2) -> list[str]:
     """
-    Standalone DDG fetch (requests only). May return [] if DDG serves minimal page to bots.
-    Prefer using get_top_search_urls(driver, query, count) with a browser.
+    Standalone DDG fetch (requests only). Returns [] if DDG serves minimal page to bots.
+    Prefer search_news_urls, which falls back to a browser in that case.
     """
-    try:
-        import requests
-        r = requests.get(
-            "https://html.duckduckgo.com/html/?q=" + urllib.parse.quote(query),
-            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0 Safari/537.36"},
-            timeout=15,
-        )
-        r.raise_for_status()
-        return _extract_uddg_urls(r.text, count)
-    except Exception as e:
-        print(f"  DuckDuckGo (requests) failed: {e}")
-    return []
+    return search_via_http(query, count) or []
@@ -0,0 +1,173 @@
+"""
+Per-host pacing helpers shared by the scraper and the article fetchers, plus
+the circuit breakers and adaptive timeouts that keep one slow or failing
+publisher from holding up the article fetches.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def host_of(url: str) -> str:
+    """Return the lowercase host of a URL without a leading "www."."""
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class HostRateLimiter:
+    """
+    Spread requests to the same host at least `min_interval` seconds apart.
+    Thread-safe: each caller reserves the next free slot for its host and
+    sleeps until then, so concurrent workers share one budget per host.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = max(float(min_interval), 0.0)
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> float:
+        """Block until `host` may be requested again. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HostConcurrencyLimiter:
+    """
+    Cap how many requests may be in flight to the same host at once.
+    slot() blocks until the host has room; schedulers that must not block use
+    try_acquire()/release() and wait_for_release() instead.
+    """
+
+    def __init__(self, per_host: int):
+        self.per_host = max(int(per_host), 1)
+        self._in_flight: dict[str, int] = {}
+        self._changed = threading.Condition()
+
+    def try_acquire(self, host: str) -> bool:
+        """Take a slot for `host` if one is free; never blocks."""
+        with self._changed:
+            if self._in_flight.get(host, 0) >= self.per_host:
+                return False
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+            return True
+
+    def release(self, host: str) -> None:
+        with self._changed:
+            remaining = self._in_flight.get(host, 0) - 1
+            if remaining > 0:
+                self._in_flight[host] = remaining
+            else:
+                self._in_flight.pop(host, None)
+            self._changed.notify_all()
+
+    def wait_for_release(self, timeout: float) -> None:
+        """Sleep until any host's slot is released, or `timeout` seconds."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        with self._changed:
+            self._changed.wait_for(lambda: self._in_flight.get(host, 0) < self.per_host)
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            self.release(host)
+
+
+class HostCircuitBreaker:
+    """
+    Stop requesting a host after `threshold` failures in a row (timeouts,
+    connection errors, error statuses). The host is then skipped for `cooldown`
+    seconds, after which a single trial request is let through: success closes
+    the circuit, failure opens it again for twice as long (up to `max_cooldown`).
+    """
+
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float | None = None):
+        self.threshold = max(int(threshold), 1)
+        self.cooldown = max(float(cooldown), 0.0)
+        self.max_cooldown = self.cooldown * 8 if max_cooldown is None else max_cooldown
+        # host -> {failures, open_until, cooldown, trial}
+        self._hosts: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state["open_until"] is None:
+                return True
+            if state["trial"] or time.monotonic() < state["open_until"]:
+                return False
+            state["trial"] = True
+            return True
+
+    def record(self, host: str, ok: bool) -> bool:
+        """Record a request's outcome; True if this failure opened the circuit."""
+        with self._lock:
+            state = self._hosts.setdefault(
+                host, {"failures": 0, "open_until": None, "cooldown": self.cooldown, "trial": False}
+            )
+            if ok:
+                state.update(failures=0, open_until=None, cooldown=self.cooldown, trial=False)
+                return False
+            state["failures"] += 1
+            if state["trial"]:
+                state["cooldown"] = min(state["cooldown"] * 2, self.max_cooldown)
+            elif state["open_until"] is not None or state["failures"] < self.threshold:
+                return False
+            state["trial"] = False
+            state["open_until"] = time.monotonic() + state["cooldown"]
+            return True
+
+
+class AdaptiveTimeouts:
+    """
+    Per-host request timeouts derived from that host's recent response times:
+    `multiplier` x the p95 of the last `window` successful requests, clamped to
+    [minimum, default]. Hosts with fewer than `min_samples` get `default`.
+    """
+
+    def __init__(
+        self,
+        default: float,
+        minimum: float,
+        multiplier: float,
+        min_samples: int = 5,
+        window: int = 50,
+    ):
+        self.default = float(default)
+        self.minimum = min(float(minimum), self.default)
+        self.multiplier = float(multiplier)
+        self.min_samples = max(int(min_samples), 1)
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, host: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def timeout(self, host: str) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(host) or ())
+        if len(samples) < self.min_samples:
+            return self.default
+        p95 = samples[min(int(0.95 * len(samples)), len(samples) - 1)]
+        return min(max(p95 * self.multiplier, self.minimum), self.default)
@@ -0,0 +1,189 @@
+"""
+Lightweight run metrics: counters and latency histograms with labels.
+Pipeline modules record into one process-wide registry; each runner resets it
+at the start of a run and writes a JSON report (STATE_DIR/metrics_<source>.json)
+at the end. The worker can serve the latest reports in Prometheus text format
+(METRICS_PORT), which works for both subprocess and in-process runs.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_counters: dict[tuple, float] = {}
+_timings: dict[tuple, list[float]] = {}
+_started_at = time.time()
+
+
+def _key(name: str, labels: dict[str, Any]) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def reset() -> None:
+    """Start a new run: drop everything recorded so far."""
+    global _started_at
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+        _started_at = time.time()
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _timings.setdefault(key, []).append(seconds)
+
+
+@contextmanager
+def timer(name: str, **labels: Any) -> Iterator[None]:
+    """Observe the wall time of the block, whether or not it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def snapshot() -> dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+        timings = {key: sorted(values) for key, values in _timings.items()}
+    timing_rows = []
+    for (name, labels), values in sorted(timings.items()):
+        timing_rows.append({
+            "name": name,
+            "labels": dict(labels),
+            "count": len(values),
+            "sum": round(sum(values), 4),
+            "p50": round(_percentile(values, 0.5), 4),
+            "p95": round(_percentile(values, 0.95), 4),
+            "max": round(values[-1], 4),
+            "buckets": {str(bound): sum(1 for v in values if v <= bound) for bound in BUCKETS},
+        })
+    return {
+        "started_at": _started_at,
+        "finished_at": time.time(),
+        "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(counters.items())],
+        "timings": timing_rows,
+    }
+
+
+def _report_dir() -> str:
+    from run_state import state_dir
+
+    return state_dir()
+
+
+def write_report(source_slug: str) -> str:
+    """Write this run's metrics to STATE_DIR/metrics_<source>.json and print the stage times."""
+    report = {"source": source_slug, **snapshot()}
+    out_path = os.path.join(_report_dir(), f"metrics_{source_slug}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    stages = ", ".join(
+        f"{row['labels'].get('stage')} {row['sum']:.1f}s"
+        for row in report["timings"] if row["name"] == "stage_seconds"
+    )
+    print(f"Run took {report['finished_at'] - report['started_at']:.1f}s ({stages}). Metrics: {out_path}")
+    return out_path
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels: dict[str, str], **extra: str) -> str:
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in merged.items()) + "}"
+
+
+def prometheus_text(reports: list[dict[str, Any]]) -> str:
+    """Render run reports in the Prometheus text exposition format."""
+    # metric -> (type, sample lines); a family's samples must be contiguous
+    families: dict[str, tuple[str, list[str]]] = {}
+
+    def add(metric: str, kind: str, line: str) -> None:
+        families.setdefault(metric, (kind, []))[1].append(line)
+
+    for report in reports:
+        source = {"source": report.get("source", "")}
+        add(
+            "trends_run_duration_seconds",
+            "gauge",
+            f"trends_run_duration_seconds{_labels_text(source)} {report['finished_at'] - report['started_at']:.3f}",
+        )
+        for row in report.get("counters", []):
+            metric = f"trends_{row['name']}_total"
+            add(metric, "counter", f"{metric}{_labels_text({**source, **row['labels']})} {row['value']}")
+        for row in report.get("timings", []):
+            metric = f"trends_{row['name']}"
+            labels = {**source, **row["labels"]}
+            for bound, count in row["buckets"].items():
+                add(metric, "histogram", f"{metric}_bucket{_labels_text(labels, le=bound)} {count}")
+            add(metric, "histogram", f"{metric}_bucket{_labels_text(labels, le='+Inf')} {row['count']}")
+            add(metric, "histogram", f"{metric}_sum{_labels_text(labels)} {row['sum']}")
+            add(metric, "histogram", f"{metric}_count{_labels_text(labels)} {row['count']}")
+
+    lines = []
+    for metric, (kind, samples) in families.items():
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def latest_reports() -> list[dict[str, Any]]:
+    reports = []
+    for path in sorted(glob.glob(os.path.join(_report_dir(), "metrics_*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def serve_prometheus(port: int) -> ThreadingHTTPServer:
+    """Serve the latest run reports at http://0.0.0.0:<port>/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text(latest_reports()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving Prometheus metrics on port {port} at /metrics")
+    return server
@@ -2,18 +2,129 @@
 Send scraped trends and article content to n8n webhook.
 Uses POST by default (payload in JSON body) to avoid 414 URI Too Large.
 Set N8N_WEBHOOK_METHOD=GET only for small payloads (no article content).
+POST bodies can be gzip/deflate encoded (N8N_COMPRESSION), serialized piece by
+piece and streamed to n8n in chunks. Payloads larger than N8N_MAX_BODY_BYTES are
+split by n8n_batches() into batches, by country and then by trend; the outbox
+queues each batch as its own delivery, so a failed batch is retried alone.
 """
 
+from __future__ import annotations
+
 import json
 import os
+import zlib
+from typing import Iterator
 
 import requests
 
+from config import N8N_COMPRESSION, N8N_MAX_BODY_BYTES
+import metrics
+
+# zlib wbits for each Content-Encoding
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+# Encoded body is handed to the connection in pieces of about this size
+_CHUNK_BYTES = 64 * 1024
+
 
-def send_to_n8n(payload: dict, webhook_url: str | None = None) -> dict:
+def _json_size(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def split_payload(payload: dict, max_bytes: int) -> list[dict]:
+    """
+    Split `payload` into payloads whose JSON stays under `max_bytes`, packing
+    whole countries where they fit and single trends otherwise. A lone trend
+    larger than the budget still goes out, in a batch of its own.
+    Batches carry "batch": {"index", "total"} so the workflow can tell them apart.
+    """
+    countries = payload.get("countries") or []
+    if max_bytes <= 0 or not countries:
+        return [payload]
+    base = {key: value for key, value in payload.items() if key != "countries"}
+    # Size of the envelope with a batch marker and an empty country list
+    base_size = _json_size({**base, "batch": {"index": 0, "total": 0}, "countries": []}) + 8
+
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    used = base_size
+
+    def close_batch() -> None:
+        nonlocal current, used
+        if current:
+            batches.append(current)
+        current, used = [], base_size
+
+    for country in countries:
+        trends = country.get("trends") or []
+        shell = {key: value for key, value in country.items() if key != "trends"}
+        shell_size = _json_size({**shell, "trends": []}) + 1
+        trend_sizes = [_json_size(trend) + 1 for trend in trends]
+        whole = shell_size + sum(trend_sizes)
+        if used + whole > max_bytes:
+            close_batch()
+        if base_size + whole <= max_bytes or not trends:
+            current.append(country)
+            used += whole
+            continue
+        # The country alone is over budget: spread its trends over several batches
+        part = None
+        for trend, size in zip(trends, trend_sizes):
+            if part is not None and used + size > max_bytes:
+                close_batch()
+                part = None
+            if part is None:
+                part = {**shell, "trends": []}
+                current.append(part)
+                used += shell_size
+            part["trends"].append(trend)
+            used += size
+    close_batch()
+
+    if len(batches) <= 1:
+        return [payload]
+    return [
+        {**base, "batch": {"index": index, "total": len(batches)}, "countries": batch}
+        for index, batch in enumerate(batches)
+    ]
+
+
+def n8n_batches(payload: dict) -> list[dict]:
+    """The payload split to the N8N_MAX_BODY_BYTES budget; one body per n8n request."""
+    return split_payload(payload, int(os.environ.get("N8N_MAX_BODY_BYTES", str(N8N_MAX_BODY_BYTES))))
+
+
+def encode_body(payload: dict, compression: str = "none", sizes: dict | None = None) -> Iterator[bytes]:
+    """
+    Serialize `payload` incrementally, compressing each piece as it is produced,
+    and yield the body in chunks of about _CHUNK_BYTES. Once the body has been
+    consumed, `sizes` gets "raw" (JSON) and "body" (sent) byte counts.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[compression]) if compression in _WBITS else None
+    raw_size = body_size = 0
+    buffer = bytearray()
+    for piece in json.JSONEncoder(ensure_ascii=False).iterencode(payload):
+        data = piece.encode("utf-8")
+        raw_size += len(data)
+        buffer += compressor.compress(data) if compressor else data
+        if len(buffer) >= _CHUNK_BYTES:
+            body_size += len(buffer)
+            yield bytes(buffer)
+            buffer.clear()
+    if compressor:
+        buffer += compressor.flush()
+    if buffer:
+        body_size += len(buffer)
+        yield bytes(buffer)
+    if sizes is not None:
+        sizes.update(raw=raw_size, body=body_size)
+
+
+def send_to_n8n(payload: dict, webhook_url: str | None = None, idempotency_key: str | None = None) -> dict:
     """
     Send payload to n8n webhook. Uses POST by default (body) so large payloads work.
     Set N8N_WEBHOOK_METHOD=GET in .env only if your webhook is GET-only and payload is small.
+    `idempotency_key` is sent as the Idempotency-Key header. The payload goes out
+    in one request; split big payloads with n8n_batches() first.
     """
     url = (webhook_url or os.environ.get("N8N_WEBHOOK_URL") or "").strip()
     if not url:
@@ -31,6 +142,8 @@ def send_to_n8n(payload: dict, webhook_url: str | None = None) -> dict:
             headers[auth_header_name] = f"Bearer {access_token}"
         else:
             headers[auth_header_name] = access_token
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
 
     try:
         if method == "GET":
@@ -41,12 +154,7 @@ def send_to_n8n(payload: dict, webhook_url: str | None = None) -> dict:
                 method = "POST"
 
         if method == "POST":
-            resp = requests.post(
-                url,
-                json=payload,
-                headers=headers,
-                timeout=300,
-            )
+            return _post(url, payload, headers)
         else:
             import base64
             import urllib.parse
@@ -64,3 +172,27 @@ def send_to_n8n(payload: dict, webhook_url: str | None = None) -> dict:
         }
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+
+def _post(url: str, payload: dict, headers: dict) -> dict:
+    compression = (os.environ.get("N8N_COMPRESSION") or N8N_COMPRESSION).strip().lower()
+    headers = {**headers, "Content-Type": "application/json; charset=utf-8"}
+    if compression in _WBITS:
+        headers["Content-Encoding"] = compression
+    sizes: dict = {}
+    # A generator body goes out with chunked transfer encoding, never whole in memory
+    with metrics.timer("n8n_post_seconds"):
+        resp = requests.post(url, data=encode_body(payload, compression, sizes), headers=headers, timeout=300)
+    metrics.inc("n8n_requests", status=resp.status_code)
+    metrics.inc("n8n_body_bytes", sizes.get("body", 0))
+    if resp.ok:
+        # Once per delivery: a retried body counts when it finally goes through
+        metrics.inc("n8n_payload_bytes", sizes.get("raw", 0))
+    result = {
+        "success": resp.ok,
+        "status_code": resp.status_code,
+        "response": resp.text[:500] if resp.text else "",
+    }
+    if not resp.ok and "batch" in payload:
+        result["error"] = f"batch {payload['batch']['index'] + 1}/{payload['batch']['total']} rejected ({resp.status_code})"
+    return result
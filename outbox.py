@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Disk-backed outbox for webhook deliveries (n8n, Open Claw).
+Every outgoing body is recorded in STATE_DIR/outbox.sqlite3 before it is sent,
+with an idempotency key derived from its sink, content and run. The key goes
+out as the Idempotency-Key header and stays the same on every retry of that
+delivery, so the receiver can deduplicate them; an identical body queued by a
+later run gets a new key. Pending deliveries are dispatched concurrently; a
+failed one is retried with exponential backoff, first within the run and then
+by later drains (the worker drains at the start of every cycle), until it
+succeeds or runs out of attempts.
+
+Usage:
+  python outbox.py                  Retry every due delivery.
+  python outbox.py <payload.json>   Queue a saved payload for n8n, then retry.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import requests
+
+from config import (
+    OUTBOX_BACKOFF_MAX_SECONDS,
+    OUTBOX_BACKOFF_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RUN_ATTEMPTS,
+    OUTBOX_WORKERS,
+)
+from n8n_sender import n8n_batches, send_to_n8n
+from run_state import RunState, incremental_enabled, state_dir
+
+# Delivered rows are kept this long for inspection
+SENT_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def _send_n8n(url: str, body: Any, key: str) -> dict:
+    return send_to_n8n(body, url, idempotency_key=key)
+
+
+def _send_openclaw(url: str, body: Any, key: str) -> dict:
+    try:
+        r = requests.post(
+            url,
+            json=body,
+            headers={"Content-Type": "application/json", "Idempotency-Key": key},
+            timeout=30,
+        )
+        return {"success": r.ok, "status_code": r.status_code, "response": r.text[:200]}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# sink name -> sender(url, body, idempotency_key) -> { success, error?, response? }
+SENDERS: dict[str, Callable[[str, Any, str], dict]] = {
+    "n8n": _send_n8n,
+    "openclaw": _send_openclaw,
+}
+
+
+def mark_sent_callback(run_state: RunState | None) -> Callable[[str, Any], None] | None:
+    """on_sent hook recording delivered n8n payloads in the incremental run state."""
+    if run_state is None:
+        return None
+
+    def on_sent(sink: str, body: Any) -> None:
+        if sink == "n8n":
+            run_state.mark_sent(body)
+
+    return on_sent
+
+
+def idempotency_key(sink: str, body: Any, run_id: str = "") -> str:
+    canonical = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{run_id}\n{sink}\n{canonical}".encode("utf-8")).hexdigest()[:32]
+
+
+class Outbox:
+    """
+    Thread-safe SQLite queue of webhook deliveries. Keys are scoped to `run_id`
+    (a fresh one per instance by default): the same body queued twice by one
+    run is one delivery, but a later run sends it again.
+    """
+
+    def __init__(self, path: str | None = None, run_id: str | None = None):
+        self.path = path or os.path.join(state_dir(), "outbox.sqlite3")
+        self.run_id = run_id or uuid.uuid4().hex
+        self.max_attempts = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", str(OUTBOX_MAX_ATTEMPTS)))
+        self.backoff = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", str(OUTBOX_BACKOFF_SECONDS)))
+        self.backoff_max = float(os.environ.get("OUTBOX_BACKOFF_MAX_SECONDS", str(OUTBOX_BACKOFF_MAX_SECONDS)))
+        self.workers = max(int(os.environ.get("OUTBOX_WORKERS", str(OUTBOX_WORKERS))), 1)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deliveries (
+                key TEXT PRIMARY KEY,
+                sink TEXT NOT NULL,
+                url TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "Outbox":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def enqueue(self, sink: str, url: str, body: Any) -> str:
+        """Record a delivery and return its key; an identical one from this run is not queued twice."""
+        key = idempotency_key(sink, body, self.run_id)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO deliveries (key, sink, url, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    status = 'pending', attempts = 0, next_attempt_at = excluded.next_attempt_at
+                WHERE status = 'dead'
+                """,
+                (key, sink, url, json.dumps(body, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+        return key
+
+    def status(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM deliveries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _due(self, keys: list[str] | None) -> list[tuple[str, str, str, str]]:
+        query = "SELECT key, sink, url, body FROM deliveries WHERE status = 'pending' AND next_attempt_at <= ?"
+        params: list[Any] = [time.time()]
+        if keys is not None:
+            query += f" AND key IN ({','.join('?' * len(keys))})"
+            params += keys
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY created_at", params).fetchall()
+
+    def _record(self, key: str, result: dict) -> bool:
+        now = time.time()
+        with self._lock:
+            if result.get("success"):
+                self._conn.execute(
+                    "UPDATE deliveries SET status = 'sent', attempts = attempts + 1, last_error = NULL WHERE key = ?",
+                    (key,),
+                )
+                self._conn.commit()
+                return True
+            attempts = self._conn.execute("SELECT attempts FROM deliveries WHERE key = ?", (key,)).fetchone()[0] + 1
+            # Exponential backoff with jitter, capped
+            delay = min(self.backoff * 2 ** (attempts - 1), self.backoff_max) * random.uniform(0.8, 1.2)
+            status = "dead" if attempts >= self.max_attempts else "pending"
+            error = str(result.get("error") or f"{result.get('status_code')} {result.get('response', '')}")[:500]
+            self._conn.execute(
+                "UPDATE deliveries SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE key = ?",
+                (status, attempts, now + delay, error, key),
+            )
+            self._conn.commit()
+            return False
+
+    def dispatch(
+        self,
+        keys: list[str] | None = None,
+        on_sent: Callable[[str, Any], None] | None = None,
+    ) -> dict[str, bool]:
+        """
+        One pass over due deliveries (only `keys` when given), sent concurrently.
+        Returns key -> delivered; `on_sent(sink, body)` runs for each success.
+        """
+        due = self._due(keys)
+        if not due:
+            return {}
+
+        def send(row: tuple[str, str, str, str]) -> bool:
+            key, sink, url, body = row
+            sender = SENDERS.get(sink)
+            payload = json.loads(body)
+            result = sender(url, payload, key) if sender else {"success": False, "error": f"unknown sink {sink}"}
+            delivered = self._record(key, result)
+            if delivered and on_sent is not None:
+                on_sent(sink, payload)
+            elif not delivered:
+                print(f"Outbox: {sink} delivery {key[:8]} failed: {result.get('error') or result.get('response')}")
+            return delivered
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(due)), thread_name_prefix="outbox") as pool:
+            return dict(zip((row[0] for row in due), pool.map(send, due)))
+
+    def deliver(
+        self,
+        keys: list[str],
+        attempts: int | None = None,
+        on_sent: Callable[[str, Any], None] | None = None,
+    ) -> dict[str, bool]:
+        """
+        Dispatch `keys` now, retrying failures with backoff up to `attempts`
+        times within this call; whatever is still pending is left for drain().
+        """
+        if attempts is None:
+            attempts = int(os.environ.get("OUTBOX_RUN_ATTEMPTS", str(OUTBOX_RUN_ATTEMPTS)))
+        # Already delivered earlier in this run
+        results = {key: self.status(key) == "sent" for key in keys}
+        remaining = [key for key in keys if not results[key]]
+        for attempt in range(max(attempts, 1)):
+            if not remaining:
+                break
+            if attempt:
+                with self._lock:
+                    row = self._conn.execute(
+                        f"SELECT MIN(next_attempt_at) FROM deliveries WHERE status = 'pending' "
+                        f"AND key IN ({','.join('?' * len(remaining))})",
+                        remaining,
+                    ).fetchone()
+                if row[0] is None:
+                    break
+                time.sleep(max(row[0] - time.time(), 0))
+            for key, delivered in self.dispatch(remaining, on_sent).items():
+                results[key] = delivered
+            remaining = [key for key in remaining if not results[key]]
+        return results
+
+    def drain(self, on_sent: Callable[[str, Any], None] | None = None) -> dict[str, bool]:
+        """Retry every due delivery once and forget old delivered ones."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM deliveries WHERE status = 'sent' AND created_at < ?",
+                (time.time() - SENT_RETENTION_SECONDS,),
+            )
+            self._conn.commit()
+        results = self.dispatch(on_sent=on_sent)
+        if results:
+            print(f"Outbox drain: {sum(results.values())}/{len(results)} pending deliveries sent.")
+        return results
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    run_state = RunState() if incremental_enabled() else None
+    with Outbox() as outbox:
+        if len(sys.argv) > 1:
+            webhook_url = (os.environ.get("N8N_WEBHOOK_URL") or "").strip()
+            if not webhook_url:
+                print("N8N_WEBHOOK_URL not set. Set it in .env to send to n8n.")
+                return
+            with open(sys.argv[1], encoding="utf-8") as f:
+                for batch in n8n_batches(json.load(f)):
+                    outbox.enqueue("n8n", webhook_url, batch)
+            print(f"Queued {sys.argv[1]} for n8n.")
+        outbox.drain(mark_sent_callback(run_state))
+    if run_state is not None:
+        run_state.close()
+
+
+if __name__ == "__main__":
+    main()
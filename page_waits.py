@@ -0,0 +1,92 @@
+"""
+Condition-based page readiness for Selenium call sites.
+Instead of sleeping a fixed time after driver.get, wait until the content we
+need is in the DOM (or the page has gone network-idle), capped by a ceiling.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Callable
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from config import PAGE_WAIT_POLL_SECONDS, PAGE_WAIT_TIMEOUT_SECONDS
+
+Condition = Callable[[Any], bool]
+
+TREND_ROW_SELECTOR = "table tbody tr, tr[role='row'], div[role='row']"
+DDG_RESULT_SELECTOR = "a.result__a, a[href*='uddg='], .no-results"
+
+
+def page_wait_timeout() -> float:
+    """Ceiling for every readiness wait (PAGE_WAIT_TIMEOUT_SECONDS, env overridable)."""
+    return float(os.environ.get("PAGE_WAIT_TIMEOUT_SECONDS", str(PAGE_WAIT_TIMEOUT_SECONDS)))
+
+
+def elements_present(selector: str) -> Condition:
+    """Ready once at least one element matches the CSS selector."""
+
+    def check(driver: Any) -> bool:
+        return bool(driver.find_elements(By.CSS_SELECTOR, selector))
+
+    return check
+
+
+def network_idle(idle_seconds: float = 0.5) -> Condition:
+    """
+    Ready once the document has loaded and no new resource entries have
+    appeared in the Performance timeline for `idle_seconds`.
+    """
+    state = {"count": -1, "since": 0.0}
+
+    def check(driver: Any) -> bool:
+        ready_state, count = driver.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length];"
+        )
+        now = time.monotonic()
+        if ready_state != "complete" or count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return now - state["since"] >= idle_seconds
+
+    return check
+
+
+def any_of(*conditions: Condition) -> Condition:
+    def check(driver: Any) -> bool:
+        return any(condition(driver) for condition in conditions)
+
+    return check
+
+
+def wait_until(driver: Any, condition: Condition, timeout: float | None = None) -> bool:
+    """
+    Poll `condition` until it holds or the ceiling is reached.
+    Returns False on timeout instead of raising so callers can scrape whatever loaded.
+    """
+    ceiling = page_wait_timeout() if timeout is None else timeout
+    try:
+        WebDriverWait(
+            driver,
+            ceiling,
+            poll_frequency=PAGE_WAIT_POLL_SECONDS,
+            ignored_exceptions=(WebDriverException,),
+        ).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_trend_rows(driver: Any, timeout: float | None = None) -> bool:
+    """Trends page: table rows rendered, or the page went idle without any."""
+    return wait_until(driver, any_of(elements_present(TREND_ROW_SELECTOR), network_idle(1.0)), timeout)
+
+
+def wait_for_ddg_results(driver: Any, timeout: float | None = None) -> bool:
+    """DuckDuckGo HTML page: result links (or the no-results block) present."""
+    return wait_until(driver, any_of(elements_present(DDG_RESULT_SELECTOR), network_idle()), timeout)
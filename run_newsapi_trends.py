@@ -7,14 +7,25 @@ import os
 
 from dotenv import load_dotenv
 
+from browser_pool import DriverPool
 from config import TREND_COUNTRIES
+from checkpoint import open_checkpoint
+import metrics
+from run_state import RunState, incremental_enabled
 from newsapi_source import fetch_newsapi_trends
-from source_pipeline import build_payload, enrich_trends_with_articles, save_payload, send_payload
+from source_pipeline import (
+    TrendFanout,
+    build_payload,
+    enrich_trends_with_articles,
+    per_trend_delivery_enabled,
+    save_payload,
+    send_payload,
+)
 
 load_dotenv()
 
 
-def main() -> None:
+def main(pool: DriverPool | None = None) -> None:
     headless = os.environ.get("HEADLESS", "true").lower() == "true"
     countries_filter = os.environ.get("COUNTRIES", "").strip()
 
@@ -28,21 +39,40 @@ def main() -> None:
         print("No countries to scrape. Set COUNTRIES=US,GB,CA,DE,CH or leave unset for all.")
         return
 
+    metrics.reset()
+    run_state = RunState() if incremental_enabled() else None
+    fanout = TrendFanout("newsapi-headlines", "live", run_state) if per_trend_delivery_enabled() else None
+    checkpoint = open_checkpoint("newsapi")
+
     print("Fetching NewsAPI trends for:", [c["geo"] for c in countries])
     trends_by_country = []
-    for country in countries:
-        trends_by_country.append(
-            {
-                "country": country["name"],
-                "geo": country["geo"],
-                "trends": fetch_newsapi_trends(country),
-            }
-        )
-
-    trends_by_country = enrich_trends_with_articles(trends_by_country, headless=headless)
+    with metrics.timer("stage_seconds", stage="scrape"):
+        for country in countries:
+            trends_by_country.append(
+                {
+                    "country": country["name"],
+                    "geo": country["geo"],
+                    "trends": fetch_newsapi_trends(country),
+                }
+            )
+
+    trends_by_country = enrich_trends_with_articles(
+        trends_by_country,
+        headless=headless,
+        pool=pool,
+        run_state=run_state,
+        checkpoint=checkpoint,
+        on_trend=fanout.send if fanout is not None else None,
+    )
     payload = build_payload("newsapi-headlines", "live", trends_by_country)
     save_payload(payload, "newsapi")
-    send_payload(payload)
+    send_payload(payload, run_state, fanout)
+    # The payload is saved and queued in the outbox, which retries delivery; the next run starts fresh
+    if checkpoint is not None:
+        checkpoint.clear()
+    if run_state is not None:
+        run_state.close()
+    metrics.write_report("newsapi")
 
 
 if __name__ == "__main__":
@@ -7,14 +7,26 @@ import os
 
 from dotenv import load_dotenv
 
+from browser_pool import DriverPool
 from config import TREND_COUNTRIES
-from source_pipeline import build_payload, enrich_trends_with_articles, save_payload, send_payload
+from checkpoint import open_checkpoint
+import metrics
+from run_state import RunState, incremental_enabled
+from source_pipeline import (
+    TrendFanout,
+    build_payload,
+    enrich_trends_with_articles,
+    per_trend_delivery_enabled,
+    run_streaming_pipeline,
+    save_payload,
+    send_payload,
+)
 from trends_scraper import scrape_all_trends
 
 load_dotenv()
 
 
-def main() -> None:
+def main(pool: DriverPool | None = None) -> None:
     headless = os.environ.get("HEADLESS", "true").lower() == "true"
     countries_filter = os.environ.get("COUNTRIES", "").strip()
 
@@ -28,12 +40,45 @@ def main() -> None:
         print("No countries to scrape. Set COUNTRIES=US,GB,CA,DE,CH or leave unset for all.")
         return
 
+    metrics.reset()
+    run_state = RunState() if incremental_enabled() else None
+    fanout = TrendFanout("google-trends-selenium", "4h", run_state) if per_trend_delivery_enabled() else None
+    checkpoint = open_checkpoint("google")
+
     print("Scraping Google Trends (real-time / 4h) for:", [c["geo"] for c in countries])
-    trends_by_country = scrape_all_trends(headless=headless, countries=countries)
-    trends_by_country = enrich_trends_with_articles(trends_by_country, headless=headless)
+    if os.environ.get("PIPELINE_MODE", "batch").strip().lower() == "streaming":
+        trends_by_country = run_streaming_pipeline(
+            lambda emit: scrape_all_trends(
+                headless=headless, countries=countries, pool=pool, on_country=emit, checkpoint=checkpoint
+            ),
+            headless=headless,
+            pool=pool,
+            on_trend=fanout.send if fanout is not None else None,
+            run_state=run_state,
+            checkpoint=checkpoint,
+        )
+    else:
+        with metrics.timer("stage_seconds", stage="scrape"):
+            trends_by_country = scrape_all_trends(
+                headless=headless, countries=countries, pool=pool, checkpoint=checkpoint
+            )
+        trends_by_country = enrich_trends_with_articles(
+            trends_by_country,
+            headless=headless,
+            pool=pool,
+            run_state=run_state,
+            checkpoint=checkpoint,
+            on_trend=fanout.send if fanout is not None else None,
+        )
     payload = build_payload("google-trends-selenium", "4h", trends_by_country)
     save_payload(payload, "google")
-    send_payload(payload)
+    send_payload(payload, run_state, fanout)
+    # The payload is saved and queued in the outbox, which retries delivery; the next run starts fresh
+    if checkpoint is not None:
+        checkpoint.clear()
+    if run_state is not None:
+        run_state.close()
+    metrics.write_report("google")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+"""
+Persistent record of what earlier runs already delivered, for incremental runs.
+Stores (geo, normalized keyword) pairs and article URLs with the time they were
+last sent, so a run can skip trends that were already turned into posts and
+avoid reusing articles that already went out.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from article_cache import canonical_url
+from config import INCREMENTAL_WINDOW_HOURS, STATE_DIR
+from search_cache import normalize_keyword
+
+
+def state_dir() -> str:
+    path = os.environ.get("STATE_DIR") or STATE_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def incremental_enabled() -> bool:
+    return os.environ.get("INCREMENTAL", "false").strip().lower() == "true"
+
+
+class RunState:
+    """Thread-safe SQLite store of sent trends and article URLs."""
+
+    def __init__(self, path: str | None = None, window_hours: float | None = None):
+        self.path = path or os.path.join(state_dir(), "run_state.sqlite3")
+        self.window = 3600 * float(window_hours if window_hours is not None else os.environ.get(
+            "INCREMENTAL_WINDOW_HOURS", INCREMENTAL_WINDOW_HOURS
+        ))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS trends (
+                geo TEXT NOT NULL,
+                key TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                first_sent REAL NOT NULL,
+                last_sent REAL NOT NULL,
+                PRIMARY KEY (geo, key)
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                first_sent REAL NOT NULL,
+                last_sent REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def trend_seen(self, geo: str, keyword: str) -> bool:
+        """True if this trend was sent for this country within the window."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_sent FROM trends WHERE geo = ? AND key = ?",
+                (geo, normalize_keyword(keyword)),
+            ).fetchone()
+        return row is not None and row[0] > time.time() - self.window
+
+    def seen_urls(self, urls: list[str]) -> set[str]:
+        """The subset of `urls` already sent in an earlier run."""
+        if not urls:
+            return set()
+        keys = {canonical_url(u): u for u in urls}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM articles WHERE key IN ({','.join('?' * len(keys))})",
+                list(keys),
+            ).fetchall()
+        return {keys[row[0]] for row in rows}
+
+    def is_new_or_changed(self, geo: str, trend: dict[str, Any]) -> bool:
+        """
+        New: not sent for this country within the window.
+        Changed: sent before, but the source now links articles we have not sent.
+        """
+        if not self.trend_seen(geo, trend.get("keyword", "")):
+            return True
+        source_urls = [u for u in (trend.get("article_urls") or []) if isinstance(u, str)]
+        return bool(set(source_urls) - self.seen_urls(source_urls))
+
+    def mark_sent(self, payload: dict[str, Any]) -> None:
+        """Record every trend and article in a delivered payload."""
+        now = time.time()
+        with self._lock:
+            for country_data in payload.get("countries", []):
+                geo = country_data.get("geo", "")
+                for trend in country_data.get("trends", []):
+                    keyword = trend.get("keyword", "")
+                    if not keyword:
+                        continue
+                    self._conn.execute(
+                        """
+                        INSERT INTO trends (geo, key, keyword, first_sent, last_sent) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (geo, key) DO UPDATE SET last_sent = excluded.last_sent
+                        """,
+                        (geo, normalize_keyword(keyword), keyword, now, now),
+                    )
+                    for url in trend.get("article_urls") or []:
+                        self._conn.execute(
+                            """
+                            INSERT INTO articles (key, first_sent, last_sent) VALUES (?, ?, ?)
+                            ON CONFLICT (key) DO UPDATE SET last_sent = excluded.last_sent
+                            """,
+                            (canonical_url(url), now, now),
+                        )
+            self._conn.commit()
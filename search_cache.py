@@ -0,0 +1,114 @@
+"""
+Search-result reuse for trend keywords.
+Within a run each normalized keyword is searched once (the same keyword often
+trends in several countries, and on several sources); across runs results are kept in a small SQLite
+cache with a TTL, so consecutive runs skip repeat DuckDuckGo page loads.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable
+
+from article_cache import cache_dir
+from config import SEARCH_CACHE_TTL_SECONDS
+from similarity import canonical_keyword
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Case-fold and collapse whitespace so "Storm  Ciarán" and "storm ciarán" share a key."""
+    text = unicodedata.normalize("NFKC", keyword or "").casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def search_key(keyword: str) -> str:
+    """
+    Key for search results: word order, accents and filler words are ignored, so
+    near-identical keywords from different countries and sources share one search.
+    """
+    return canonical_keyword(keyword) or normalize_keyword(keyword)
+
+
+def search_cache_enabled() -> bool:
+    return os.environ.get("SEARCH_CACHE", "true").strip().lower() == "true"
+
+
+class SearchCache:
+    """Thread-safe SQLite store: normalized keyword -> result URLs."""
+
+    def __init__(self, path: str | None = None, ttl: float | None = None):
+        self.path = path or os.path.join(cache_dir(), "search.sqlite3")
+        self.ttl = float(ttl if ttl is not None else os.environ.get(
+            "SEARCH_CACHE_TTL_SECONDS", SEARCH_CACHE_TTL_SECONDS
+        ))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                urls TEXT NOT NULL,
+                requested INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, keyword: str, count: int) -> list[str] | None:
+        """Cached URLs for `keyword` if fresh and the stored search asked for at least `count`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT urls, requested, expires_at FROM searches WHERE key = ?",
+                (search_key(keyword),),
+            ).fetchone()
+        if row is None or row[2] <= time.time() or row[1] < count:
+            return None
+        return json.loads(row[0])[:count]
+
+    def put(self, keyword: str, urls: list[str], count: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, urls, requested, expires_at) VALUES (?, ?, ?, ?)",
+                (search_key(keyword), json.dumps(urls), count, now + self.ttl),
+            )
+            self._conn.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+
+class CoalescingSearch:
+    """
+    Wrap a search function so each search_key is searched at most once
+    per run, consulting the persistent SearchCache before searching.
+    Empty results are not persisted (they are usually a blocked or failed page).
+    """
+
+    def __init__(self, search: Callable[[str, int], list[str]], cache: SearchCache | None = None):
+        self._search = search
+        self.cache = cache
+        self._run_results: dict[str, list[str]] = {}
+        self.searches = 0
+
+    def get(self, keyword: str, count: int) -> list[str]:
+        key = search_key(keyword)
+        if key in self._run_results:
+            return self._run_results[key][:count]
+        urls = self.cache.get(keyword, count) if self.cache is not None else None
+        if urls is None:
+            urls = self._search(keyword, count)
+            self.searches += 1
+            if urls and self.cache is not None:
+                self.cache.put(keyword, urls, count)
+        self._run_results[key] = urls
+        return urls[:count]
@@ -0,0 +1,156 @@
+"""
+Near-duplicate detection for trend keywords.
+The same story often trends in several countries (and on several sources)
+under slightly different names: "Lakers vs Celtics", "Celtics - Lakers",
+"lakers celtics". Keywords are reduced to a set of folded word tokens, hashed
+into MinHash signatures and bucketed with LSH banding; candidates sharing a
+bucket are confirmed with the exact Jaccard similarity of their token sets.
+Short keywords and numbers carry the whole story ("game 5" vs "game 6"), so
+those must match exactly.
+Article content gets a SimHash fingerprint, so syndicated copies of one story
+can be told apart from distinct sources by Hamming distance.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import re
+import threading
+import unicodedata
+from typing import Iterable
+
+from config import TREND_CLUSTER_THRESHOLD
+
+# Words that say nothing about which story a keyword is about
+STOPWORDS = frozenset(
+    "a an and at by de del der des die das du el en et for from in la las le les los of on "
+    "the to und v vs versus y".split()
+)
+
+# 20 bands x 3 rows: pairs at Jaccard 0.6 share a bucket ~99% of the time,
+# pairs at 0.3 ~40% (those are then rejected by the exact check).
+_BANDS = 20
+_ROWS = 3
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x7E4D)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(_BANDS * _ROWS)]
+# Keywords this short only merge when every token matches
+_EXACT_MAX_TOKENS = 4
+
+
+def keyword_tokens(keyword: str) -> frozenset[str]:
+    """Accent- and case-folded word tokens, without stopwords and possessive 's."""
+    text = unicodedata.normalize("NFKD", keyword or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    words = [re.sub(r"'s$", "", w) for w in re.findall(r"\w+(?:'s)?", text)]
+    tokens = frozenset(w for w in words if w and w not in STOPWORDS)
+    # "The Who" is all stopwords; keep something to compare
+    return tokens or frozenset(w for w in words if w)
+
+
+def canonical_keyword(keyword: str) -> str:
+    """Order-insensitive key: "Lakers vs. Celtics" and "celtics lakers" share one."""
+    return " ".join(sorted(keyword_tokens(keyword)))
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _numbers(tokens: frozenset[str]) -> frozenset[str]:
+    return frozenset(t for t in tokens if any(ch.isdigit() for ch in t))
+
+
+def _similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """Jaccard similarity, or 0 when the keywords can't be the same story."""
+    if _numbers(a) != _numbers(b):
+        return 0.0
+    if max(len(a), len(b)) <= _EXACT_MAX_TOKENS:
+        return 1.0 if a == b else 0.0
+    return jaccard(a, b)
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(tokens: Iterable[str]) -> tuple[int, ...]:
+    hashes = [_token_hash(t) for t in tokens]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+class TrendClusterer:
+    """
+    Incremental clustering: add(keyword) returns the id of the cluster it joins
+    (the id of the first keyword of that cluster) and whether it started a new
+    one. A keyword joins a cluster when its token set is at least `threshold`
+    Jaccard-similar to any member, has the same numeric tokens and, if both
+    have at most four tokens, the same tokens. Thread-safe.
+    """
+
+    def __init__(self, threshold: float | None = None):
+        if threshold is None:
+            threshold = float(os.environ.get("TREND_CLUSTER_THRESHOLD", str(TREND_CLUSTER_THRESHOLD)))
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._tokens: list[frozenset[str]] = []
+        self._cluster_of: list[int] = []
+        self._buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+
+    def add(self, keyword: str) -> tuple[int, bool]:
+        tokens = keyword_tokens(keyword)
+        signature = minhash(tokens)
+        bands = [(band, signature[band * _ROWS:(band + 1) * _ROWS]) for band in range(_BANDS)] if signature else []
+        with self._lock:
+            index = len(self._tokens)
+            candidates = {other for band in bands for other in self._buckets.get(band, ())}
+            cluster = index
+            best = 0.0
+            for other in sorted(candidates):
+                score = _similarity(tokens, self._tokens[other])
+                if score >= self.threshold and score > best:
+                    best, cluster = score, self._cluster_of[other]
+            self._tokens.append(tokens)
+            self._cluster_of.append(cluster)
+            for band in bands:
+                self._buckets.setdefault(band, []).append(index)
+            return cluster, cluster == index
+
+
+def trend_clustering_enabled() -> bool:
+    return os.environ.get("TREND_CLUSTERING", "true").strip().lower() == "true"
+
+
+def cluster_keywords(keywords: list[str], threshold: float | None = None) -> list[list[int]]:
+    """Group indexes of near-duplicate keywords; each group starts with its first keyword."""
+    clusterer = TrendClusterer(threshold)
+    groups: dict[int, list[int]] = {}
+    for index, keyword in enumerate(keywords):
+        cluster, _ = clusterer.add(keyword)
+        groups.setdefault(cluster, []).append(index)
+    return list(groups.values())
+
+
+def simhash(text: str, shingle_words: int = 3) -> int:
+    """
+    64-bit SimHash of `text` over overlapping word shingles. Copies of the same
+    story with a different headline, byline or footer differ in only a few bits.
+    """
+    words = re.findall(r"\w+", unicodedata.normalize("NFKC", text or "").casefold())
+    if not words:
+        return 0
+    shingles = {" ".join(words[i:i + shingle_words]) for i in range(max(len(words) - shingle_words + 1, 1))}
+    rows = [format(_token_hash(s), "064b") for s in shingles]
+    half = len(rows) / 2
+    # Column i holds bit i of every shingle hash; the fingerprint bit is the majority vote
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*rows)), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
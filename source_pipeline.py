@@ -6,82 +6,355 @@ from __future__ import annotations
 
 import json
 import os
+import queue
+import threading
 import time
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Iterator
 
-import requests
-
-from article_extractor import extract_article_content
+from article_fetcher import ArticleFetcher
+from browser_pool import DriverPool, lease_driver
+from checkpoint import Checkpoint, trend_key
 from config import (
+    DELIVERY_MODE,
     MAX_ARTICLES_PER_TREND,
     MIN_ARTICLE_CONTENT_LENGTH,
+    N8N_TREND_CONCURRENCY,
+    PIPELINE_FETCH_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    SEARCH_MIN_INTERVAL_SECONDS,
     SEARCH_URLS_TO_TRY,
 )
-from google_search import get_top_search_urls
-from n8n_sender import send_to_n8n
+from google_search import search_news_urls
+from host_limits import HostRateLimiter
+import metrics
+from n8n_sender import n8n_batches
+from outbox import Outbox, mark_sent_callback
+from run_state import RunState
+from search_cache import CoalescingSearch, SearchCache, search_cache_enabled
+from similarity import TrendClusterer, cluster_keywords, trend_clustering_enabled
 from trends_scraper import create_driver
 
 
-def enrich_trends_with_articles(trends_by_country: list[dict[str, Any]], headless: bool = True) -> list[dict[str, Any]]:
+def filter_new_trends(trends_by_country: list[dict[str, Any]], run_state: RunState | None) -> None:
+    """Drop, in place, trends an earlier run already sent that have no new source articles."""
+    if run_state is None:
+        return
+    skipped = 0
+    for country_data in trends_by_country:
+        kept = [t for t in country_data["trends"] if run_state.is_new_or_changed(country_data["geo"], t)]
+        skipped += len(country_data["trends"]) - len(kept)
+        country_data["trends"] = kept
+    if skipped:
+        print(f"Incremental run: skipping {skipped} trends already sent in earlier runs.")
+
+
+@contextmanager
+def _trend_search(
+    headless: bool,
+    pool: DriverPool | None,
+    run_state: RunState | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> Iterator[Callable[[dict[str, Any], dict[str, Any]], None]]:
+    """
+    Yield resolve(country_data, trend), which sets trend["_urls_to_try"] to the
+    trend's own article URLs plus search results, minus articles already sent
+    in earlier runs (when `run_state` is given). URL lists are saved to and
+    reused from `checkpoint` when given. Searches go over plain HTTP
+    first; a browser (borrowed from `pool` when given) is only started for
+    queries DuckDuckGo answers with its minimal page. Each keyword is searched
+    once per run, and results are reused across runs through the search cache.
+    """
+    search_limiter = HostRateLimiter(
+        float(os.environ.get("SEARCH_MIN_INTERVAL_SECONDS", str(SEARCH_MIN_INTERVAL_SECONDS)))
+    )
+    search_cache = SearchCache() if search_cache_enabled() else None
+    tiers = {"http": 0, "browser": 0}
+    resolved = [0]
+    with ExitStack() as browser_stack:
+        drivers = []
+
+        def get_driver() -> Any:
+            if not drivers:
+                drivers.append(
+                    browser_stack.enter_context(lease_driver(pool, lambda: create_driver(headless=headless)))
+                )
+            return drivers[0]
+
+        def tiered_search(query: str, count: int) -> list[str]:
+            search_limiter.wait("duckduckgo.com")
+            start = time.perf_counter()
+            urls, tier = search_news_urls(query, count, get_driver)
+            metrics.observe("search_seconds", time.perf_counter() - start, tier=tier)
+            metrics.inc("search_results", len(urls), tier=tier)
+            tiers[tier] += 1
+            return urls
+
+        search = CoalescingSearch(tiered_search, search_cache)
+
+        def resolve(country_data: dict[str, Any], trend: dict[str, Any]) -> None:
+            resolved[0] += 1
+            keyword = trend.get("keyword", "")
+            if not keyword:
+                trend["article_urls"] = []
+                return
+            saved = checkpoint.urls(country_data["geo"], keyword) if checkpoint is not None else None
+            if saved is not None:
+                trend["_urls_to_try"] = saved
+                return
+            existing_urls = [
+                u
+                for u in (trend.get("article_urls") or [])
+                if isinstance(u, str) and u.startswith("http")
+            ]
+            extra_urls = search.get(keyword, SEARCH_URLS_TO_TRY)
+            urls = []
+            for candidate in existing_urls + extra_urls:
+                if candidate not in urls:
+                    urls.append(candidate)
+            if run_state is not None:
+                already_sent = run_state.seen_urls(urls)
+                urls = [u for u in urls if u not in already_sent]
+            trend["_urls_to_try"] = urls
+            if checkpoint is not None:
+                checkpoint.save_urls(country_data["geo"], keyword, urls)
+            if urls:
+                kw = keyword[:50].encode("ascii", "replace").decode("ascii")
+                source = trend.get("trend_source") or "google"
+                print(f"  [{country_data['geo']}/{source}] \"{kw}\" -> {len(urls)} URLs to try")
+
+        try:
+            yield resolve
+        finally:
+            if search_cache is not None:
+                search_cache.close()
+            print(
+                f"Ran {search.searches} searches for {resolved[0]} trends "
+                f"({tiers['http']} over HTTP, {tiers['browser']} in the browser)."
+            )
+
+
+def _store_articles(
+    country_data: dict[str, Any],
+    trend: dict[str, Any],
+    articles: list[dict[str, Any]],
+    checkpoint: Checkpoint | None = None,
+) -> None:
+    if checkpoint is not None and trend.get("keyword"):
+        checkpoint.save_articles(country_data["geo"], trend["keyword"], articles)
+    trend["article_urls"] = [art["url"] for art in articles]
+    trend["articles"] = articles
+    if trend["articles"]:
+        kw = (trend.get("keyword", "") or "")[:50].encode("ascii", "replace").decode("ascii")
+        print(f"  \"{kw}\" -> {len(trend['articles'])} articles with content")
+
+
+def _cluster_pending(pending: list[tuple[dict[str, Any], dict[str, Any]]]) -> list[list[int]]:
+    """Group near-duplicate trends (across countries) so each group is enriched once."""
+    if not trend_clustering_enabled():
+        return [[i] for i in range(len(pending))]
+    clusters = cluster_keywords([trend.get("keyword", "") for _, trend in pending])
+    merged = len(pending) - len(clusters)
+    if merged:
+        metrics.inc("trends_clustered", merged)
+        print(f"Clustered {len(pending)} trends into {len(clusters)} stories; near-duplicates share one search and fetch.")
+    return clusters
+
+
+def enrich_trends_with_articles(
+    trends_by_country: list[dict[str, Any]],
+    headless: bool = True,
+    pool: DriverPool | None = None,
+    run_state: RunState | None = None,
+    checkpoint: Checkpoint | None = None,
+    on_trend: Callable[[dict[str, Any], dict[str, Any]], None] | None = None,
+) -> list[dict[str, Any]]:
     """
     For each trend, collect candidate URLs and keep only articles with real content.
+    Searches borrow a browser from `pool` when given instead of starting a new one.
+    With `run_state`, trends and articles already sent in earlier runs are skipped.
+    With `checkpoint`, searched URLs and fetched articles are saved per trend and
+    trends it already holds are not searched or fetched again.
+    `on_trend(country_data, trend)` runs as each fetched trend is finished.
+    Near-duplicate trends (e.g. the same story trending in several countries)
+    are searched and fetched once, from their combined source URLs, and all get
+    the resulting articles.
     """
+    filter_new_trends(trends_by_country, run_state)
+    pending = []
+    for country_data in trends_by_country:
+        for trend in country_data["trends"]:
+            saved = checkpoint.articles(country_data["geo"], trend.get("keyword", "")) if checkpoint else None
+            if saved is not None:
+                _store_articles(country_data, trend, saved)
+            else:
+                pending.append((country_data, trend))
+
+    clusters = _cluster_pending(pending)
+
     print("Getting recent articles per trend (news search, skip empty until we have enough content)...")
-    driver = create_driver(headless=headless)
-    try:
-        for country_data in trends_by_country:
-            for trend in country_data["trends"]:
-                keyword = trend.get("keyword", "")
-                if not keyword:
-                    trend["article_urls"] = []
-                    continue
-                existing_urls = [
-                    u
-                    for u in (trend.get("article_urls") or [])
-                    if isinstance(u, str) and u.startswith("http")
-                ]
-                extra_urls = get_top_search_urls(driver, keyword, count=SEARCH_URLS_TO_TRY)
-                urls = []
-                for candidate in existing_urls + extra_urls:
-                    if candidate not in urls:
-                        urls.append(candidate)
-                trend["_urls_to_try"] = urls
-                if urls:
-                    kw = keyword[:50].encode("ascii", "replace").decode("ascii")
-                    source = trend.get("trend_source") or "google"
-                    print(f"  [{country_data['geo']}/{source}] \"{kw}\" -> {len(urls)} URLs to try")
-                time.sleep(0.8)
-    finally:
-        driver.quit()
+    url_lists = []
+    with metrics.timer("stage_seconds", stage="search"), _trend_search(headless, pool, run_state, checkpoint) as resolve:
+        for cluster in clusters:
+            country_data, lead = pending[cluster[0]]
+            # The first trend is searched for the whole cluster, with every member's own links
+            probe = {**lead, "article_urls": [u for i in cluster for u in pending[i][1].get("article_urls") or []]}
+            resolve(country_data, probe)
+            url_lists.append(probe.pop("_urls_to_try", []) or probe.get("article_urls", []))
 
     print("Fetching full content (skipping empty, using next until we have enough)...")
-    for country_data in trends_by_country:
-        for trend in country_data["trends"]:
-            urls_to_try = trend.pop("_urls_to_try", []) or trend.get("article_urls", [])
-            trend["article_urls"] = []
-            trend["articles"] = []
-            for url in urls_to_try:
-                if len(trend["articles"]) >= MAX_ARTICLES_PER_TREND:
-                    break
-                art = extract_article_content(url)
-                content = (art.get("content") or "").strip()
-                if art.get("success") and len(content) >= MIN_ARTICLE_CONTENT_LENGTH:
-                    trend["article_urls"].append(art["url"])
-                    trend["articles"].append(
-                        {
-                            "url": art["url"],
-                            "title": art.get("title") or "",
-                            "content": content,
-                            "success": True,
-                        }
-                    )
-            if trend["articles"]:
-                kw = (trend.get("keyword", "") or "")[:50].encode("ascii", "replace").decode("ascii")
-                print(f"  \"{kw}\" -> {len(trend['articles'])} articles with content")
+
+    def on_done(index: int, articles: list[dict[str, Any]]) -> None:
+        for member in clusters[index]:
+            _store_articles(*pending[member], list(articles), checkpoint)
+            if on_trend is not None:
+                on_trend(*pending[member])
+
+    with metrics.timer("stage_seconds", stage="fetch"), ArticleFetcher() as fetcher:
+        fetcher.collect(url_lists, MAX_ARTICLES_PER_TREND, MIN_ARTICLE_CONTENT_LENGTH, on_done)
 
     return trends_by_country
 
 
+_STAGE_DONE = object()
+
+
+def run_streaming_pipeline(
+    produce: Callable[[Callable[[dict[str, Any]], None]], Any],
+    headless: bool = True,
+    pool: DriverPool | None = None,
+    on_trend: Callable[[dict[str, Any], dict[str, Any]], None] | None = None,
+    run_state: RunState | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Streaming alternative to scrape-everything-then-enrich-everything.
+    `produce(emit)` calls emit(country_data) as each country's trends are found
+    (e.g. scrape_all_trends(..., on_country=emit)). Every trend then flows
+    search -> fetch/extract -> emit on its own, through bounded queues, and
+    `on_trend(country_data, trend)` runs as soon as that trend is enriched.
+    A near-duplicate of an earlier trend skips search and fetch and gets that
+    trend's articles once they are ready.
+    Returns trends_by_country (in the order countries were produced) for the final payload.
+    """
+    queue_size = int(os.environ.get("PIPELINE_QUEUE_SIZE", str(PIPELINE_QUEUE_SIZE)))
+    fetch_workers = max(int(os.environ.get("PIPELINE_FETCH_WORKERS", str(PIPELINE_FETCH_WORKERS))), 1)
+    to_search: queue.Queue = queue.Queue(maxsize=queue_size)
+    to_fetch: queue.Queue = queue.Queue(maxsize=queue_size)
+    to_emit: queue.Queue = queue.Queue(maxsize=queue_size)
+    trends_by_country: list[dict[str, Any]] = []
+    errors: list[BaseException] = []
+    clusterer = TrendClusterer() if trend_clustering_enabled() else None
+    shared: dict[int, Future] = {}
+
+    def produce_stage() -> None:
+        def emit(country_data: dict[str, Any]) -> None:
+            filter_new_trends([country_data], run_state)
+            trends_by_country.append(country_data)
+            for trend in country_data["trends"]:
+                to_search.put((country_data, trend))
+
+        try:
+            produce(emit)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            to_search.put(_STAGE_DONE)
+
+    def search_stage() -> None:
+        producer_done = False
+        try:
+            # The search stage starts its own browser if it needs one: borrowing
+            # from `pool` could deadlock against a producer holding the pool's
+            # drivers while blocked on a full queue.
+            with _trend_search(headless, None, run_state, checkpoint) as resolve:
+                while (item := to_search.get()) is not _STAGE_DONE:
+                    country_data, trend = item
+                    if clusterer is not None:
+                        cluster, leads = clusterer.add(trend.get("keyword", ""))
+                        if leads:
+                            shared[cluster] = Future()
+                        else:
+                            metrics.inc("trends_clustered")
+                        # Near-duplicates of an earlier trend wait for its articles instead
+                        trend["_cluster"] = (shared[cluster], leads)
+                        if not leads:
+                            to_fetch.put(item)
+                            continue
+                    resolve(country_data, trend)
+                    to_fetch.put(item)
+                producer_done = True
+        except BaseException as e:
+            errors.append(e)
+            # Keep draining so the producer is never blocked on a full queue
+            while not producer_done:
+                producer_done = to_search.get() is _STAGE_DONE
+        finally:
+            for _ in range(fetch_workers):
+                to_fetch.put(_STAGE_DONE)
+
+    def release(trend: dict[str, Any]) -> None:
+        """Hand a cluster leader's articles to the near-duplicates waiting on it."""
+        future, leads = trend.pop("_cluster", (None, False))
+        if leads:
+            future.set_result(trend.get("articles") or [])
+
+    def fetch_stage(fetcher: ArticleFetcher) -> None:
+        try:
+            while (item := to_fetch.get()) is not _STAGE_DONE:
+                country_data, trend = item
+                try:
+                    urls = trend.pop("_urls_to_try", []) or trend.get("article_urls", [])
+                    future, leads = trend.get("_cluster", (None, True))
+                    saved = checkpoint.articles(country_data["geo"], trend.get("keyword", "")) if checkpoint else None
+                    if saved is not None:
+                        _store_articles(country_data, trend, saved)
+                    elif not leads:
+                        _store_articles(country_data, trend, list(future.result()), checkpoint)
+                    else:
+                        articles = fetcher.collect([urls], MAX_ARTICLES_PER_TREND, MIN_ARTICLE_CONTENT_LENGTH)[0]
+                        _store_articles(country_data, trend, articles, checkpoint)
+                finally:
+                    release(trend)
+                to_emit.put(item)
+        except BaseException as e:
+            errors.append(e)
+            while (item := to_fetch.get()) is not _STAGE_DONE:
+                release(item[1])
+        finally:
+            to_emit.put(_STAGE_DONE)
+
+    print("Streaming pipeline: scrape -> search -> fetch -> emit per trend...")
+    with metrics.timer("stage_seconds", stage="pipeline"), ArticleFetcher() as fetcher:
+        threads = [
+            threading.Thread(target=produce_stage, name="pipeline-produce", daemon=True),
+            threading.Thread(target=search_stage, name="pipeline-search", daemon=True),
+        ] + [
+            threading.Thread(target=fetch_stage, args=(fetcher,), name=f"pipeline-fetch-{i}", daemon=True)
+            for i in range(fetch_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        finished = 0
+        while finished < fetch_workers:
+            item = to_emit.get()
+            if item is _STAGE_DONE:
+                finished += 1
+                continue
+            if on_trend is not None:
+                try:
+                    on_trend(*item)
+                except Exception as e:
+                    print(f"on_trend failed: {e}")
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return trends_by_country
+
+
 def build_payload(source: str, timeframe: str, trends_by_country: list[dict[str, Any]]) -> dict[str, Any]:
     return {
         "source": source,
@@ -98,43 +371,128 @@ def build_payload(source: str, timeframe: str, trends_by_country: list[dict[str,
 
 
 def save_payload(payload: dict[str, Any], source_slug: str) -> str:
-    out_path = os.path.join(os.path.dirname(__file__), f"trends_output_{source_slug}.json")
+    out_dir = os.environ.get("OUTPUT_DIR") or os.path.dirname(__file__)
+    out_path = os.path.join(out_dir, f"trends_output_{source_slug}.json")
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2, ensure_ascii=False)
     print(f"Saved payload to {out_path}")
     return out_path
 
 
-def send_payload(payload: dict[str, Any]) -> None:
+def per_trend_delivery_enabled() -> bool:
+    return (os.environ.get("DELIVERY_MODE") or DELIVERY_MODE).strip().lower() == "per_trend"
+
+
+class TrendFanout:
+    """
+    Per-trend n8n delivery: each trend goes out as its own one-country,
+    one-trend payload (the same shape as the full payload) as soon as it is
+    ready, through the outbox, with at most N8N_TREND_CONCURRENCY in flight.
+    Use send as the streaming pipeline's on_trend; send_payload sends
+    whatever was not sent yet and waits for the rest.
+    """
+
+    def __init__(self, source: str, timeframe: str, run_state: RunState | None = None):
+        self.source = source
+        self.timeframe = timeframe
+        self.webhook_url = (os.environ.get("N8N_WEBHOOK_URL") or "").strip()
+        self._on_sent = mark_sent_callback(run_state)
+        self._outbox = Outbox()
+        concurrency = int(os.environ.get("N8N_TREND_CONCURRENCY", str(N8N_TREND_CONCURRENCY)))
+        self._executor = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="trend-delivery")
+        self._lock = threading.Lock()
+        self._sent: set[str] = set()
+        self._futures: list[Future] = []
+
+    def send(self, country_data: dict[str, Any], trend: dict[str, Any]) -> None:
+        if not self.webhook_url:
+            return
+        with self._lock:
+            key = trend_key(country_data["geo"], trend.get("keyword", ""))
+            if key in self._sent:
+                return
+            self._sent.add(key)
+        body = build_payload(
+            self.source,
+            self.timeframe,
+            [{"country": country_data["country"], "geo": country_data["geo"], "trends": [trend]}],
+        )
+        outbox_key = self._outbox.enqueue("n8n", self.webhook_url, body)
+        future = self._executor.submit(self._outbox.deliver, [outbox_key], None, self._on_sent)
+        with self._lock:
+            self._futures.append(future)
+
+    def close(self) -> bool:
+        """Wait for every trend in flight; True if n8n accepted all of them."""
+        delivered = 0
+        for future in self._futures:
+            try:
+                delivered += all(future.result().values())
+            except Exception as e:
+                print(f"Trend delivery failed: {e}")
+        self._executor.shutdown()
+        self._outbox.close()
+        if self._futures:
+            print(f"Sent {delivered}/{len(self._futures)} trends to n8n individually.")
+        return delivered == len(self._futures)
+
+
+def send_payload(
+    payload: dict[str, Any],
+    run_state: RunState | None = None,
+    fanout: TrendFanout | None = None,
+) -> bool:
+    """
+    Queue the payload for n8n and one message per country for Open Claw in the
+    outbox, then deliver them concurrently, with retries. Returns True if n8n
+    accepted the payload; anything undelivered stays queued for the next drain.
+    With `fanout`, n8n gets each trend separately instead of one payload.
+    Nothing is queued when no trends are left (e.g. all sent in earlier runs).
+    """
+    if not any(country_data.get("trends") for country_data in payload.get("countries", [])):
+        print("No new trends to send; skipping n8n and Open Claw.")
+        return fanout.close() if fanout is not None else True
+    stage_start = time.perf_counter()
+    outbox = Outbox()
+    n8n_keys = []
+    keys = []
     webhook_url = (os.environ.get("N8N_WEBHOOK_URL") or "").strip()
-    if webhook_url:
-        result = send_to_n8n(payload, webhook_url)
-        if result.get("success"):
-            print("Sent to n8n successfully.")
-        else:
-            print("n8n send failed:", result.get("error") or result.get("response"))
+    if webhook_url and fanout is not None:
+        for country_data in payload.get("countries", []):
+            for trend in country_data.get("trends", []):
+                fanout.send(country_data, trend)
+    elif webhook_url:
+        # Each batch is its own delivery, so a failed batch is retried without resending the others
+        n8n_keys = [outbox.enqueue("n8n", webhook_url, batch) for batch in n8n_batches(payload)]
+        keys.extend(n8n_keys)
     else:
         print("N8N_WEBHOOK_URL not set. Set it in .env to send to n8n.")
 
     openclaw_url = (os.environ.get("OPENCLAW_WEBHOOK_URL") or "").strip()
+    openclaw_keys = {}
     if openclaw_url:
         for country_data in payload.get("countries", []):
             region = country_data.get("geo", "US")
             trends = [t.get("keyword", "").strip() for t in country_data.get("trends", []) if t.get("keyword")]
-            if not trends:
-                continue
-            try:
-                r = requests.post(
-                    openclaw_url,
-                    json={"trends": trends, "region": region},
-                    headers={"Content-Type": "application/json"},
-                    timeout=30,
-                )
-                if r.ok:
-                    print(f"Open Claw ({region}): sent {len(trends)} trends.")
-                else:
-                    print(f"Open Claw ({region}): {r.status_code} {r.text[:200]}")
-            except Exception as e:
-                print(f"Open Claw ({region}): {e}")
+            if trends:
+                openclaw_keys[outbox.enqueue("openclaw", openclaw_url, {"trends": trends, "region": region})] = region
+        keys.extend(openclaw_keys)
     else:
         print("OPENCLAW_WEBHOOK_URL not set. Set it in .env to send to Open Claw.")
+
+    results = outbox.deliver(keys, on_sent=mark_sent_callback(run_state)) if keys else {}
+    outbox.close()
+    if fanout is not None:
+        delivered = fanout.close() and bool(webhook_url)
+    else:
+        sent = sum(results[key] for key in n8n_keys)
+        delivered = bool(n8n_keys) and sent == len(n8n_keys)
+        if len(n8n_keys) > 1:
+            rest = "" if delivered else "; the rest are kept in the outbox for retry"
+            print(f"Sent {sent}/{len(n8n_keys)} n8n batches{rest}.")
+        elif n8n_keys:
+            print("Sent to n8n successfully." if delivered else "n8n send failed; kept in the outbox for retry.")
+    for key, region in openclaw_keys.items():
+        print(f"Open Claw ({region}): {'sent' if results[key] else 'failed; kept in the outbox for retry'}.")
+    metrics.observe("stage_seconds", time.perf_counter() - stage_start, stage="send")
+    return delivered
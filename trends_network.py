@@ -0,0 +1,122 @@
+"""
+Read Google Trends data straight from the page's XHR responses.
+The Trending now page loads its table from a batchexecute RPC (rpcid i0OFE);
+with Chrome performance logging enabled we can pick that response out of the
+DevTools network log and parse it instead of walking the rendered DOM.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+TRENDING_RPC_ID = "i0OFE"
+
+
+def drain_performance_log(driver: Any) -> list[dict[str, Any]]:
+    """Return (and clear) buffered DevTools events as decoded message dicts."""
+    events = []
+    for entry in driver.get_log("performance"):
+        try:
+            events.append(json.loads(entry["message"])["message"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return events
+
+
+def _trending_request_ids(events: list[dict[str, Any]]) -> list[str]:
+    request_ids = []
+    for event in events:
+        if event.get("method") != "Network.responseReceived":
+            continue
+        params = event.get("params") or {}
+        response_url = (params.get("response") or {}).get("url") or ""
+        if "batchexecute" in response_url and TRENDING_RPC_ID in response_url:
+            request_ids.append(params.get("requestId"))
+    return [r for r in request_ids if r]
+
+
+def _at(seq: Any, index: int) -> Any:
+    if isinstance(seq, list) and len(seq) > index:
+        return seq[index]
+    return None
+
+
+def parse_batchexecute(body: str) -> list[Any]:
+    """
+    Return the decoded payloads of every i0OFE envelope in a batchexecute body.
+    Body format: ")]}'" guard line, then length-prefixed JSON chunks of
+    ["wrb.fr", rpcid, "<json string>", ...] envelopes.
+    """
+    payloads = []
+    for line in body.splitlines():
+        line = line.strip()
+        if not line.startswith("["):
+            continue
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            continue
+        for envelope in chunk if isinstance(chunk, list) else []:
+            if (
+                isinstance(envelope, list)
+                and _at(envelope, 0) == "wrb.fr"
+                and _at(envelope, 1) == TRENDING_RPC_ID
+                and isinstance(_at(envelope, 2), str)
+            ):
+                try:
+                    payloads.append(json.loads(envelope[2]))
+                except ValueError:
+                    continue
+    return payloads
+
+
+def _trend_from_item(item: list[Any]) -> dict[str, Any] | None:
+    keyword = _at(item, 0)
+    if not isinstance(keyword, str) or not keyword.strip():
+        return None
+    trend: dict[str, Any] = {"keyword": keyword.strip(), "article_urls": []}
+    volume = _at(item, 6)
+    if isinstance(volume, (int, float)):
+        trend["search_volume"] = int(volume)
+    started = _at(_at(item, 3), 0)
+    if isinstance(started, (int, float)):
+        trend["started"] = datetime.fromtimestamp(started, tz=timezone.utc).isoformat()
+    breakdown = _at(item, 9)
+    if isinstance(breakdown, list):
+        trend["breakdown"] = [b for b in breakdown if isinstance(b, str)]
+    return trend
+
+
+def trends_from_payloads(payloads: list[Any]) -> list[dict[str, Any]]:
+    """Map decoded i0OFE payloads to trend dicts (keyword, volume, start time, breakdown)."""
+    trends = []
+    seen = set()
+    for payload in payloads:
+        items = _at(payload, 1)
+        for item in items if isinstance(items, list) else []:
+            trend = _trend_from_item(item) if isinstance(item, list) else None
+            if trend and trend["keyword"] not in seen:
+                seen.add(trend["keyword"])
+                trends.append(trend)
+    return trends
+
+
+def capture_trends(driver: Any) -> list[dict[str, Any]]:
+    """
+    Pull the trending payload out of the network log of the page just loaded.
+    Returns [] when no matching response was captured (caller falls back to DOM).
+    """
+    payloads = []
+    for request_id in _trending_request_ids(drain_performance_log(driver)):
+        try:
+            response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            continue
+        body = response.get("body") or ""
+        if response.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", "replace")
+        payloads.extend(parse_batchexecute(body))
+    return trends_from_payloads(payloads)
@@ -3,12 +3,16 @@ Scrape Google Trends real-time (4h) for configured countries.
 Returns trend keywords and related article URLs for each country.
 """
 
+import json
 import os
 import time
+from functools import lru_cache
+from typing import Callable
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from webdriver_manager.chrome import ChromeDriverManager
 from config import (
     TREND_COUNTRIES,
@@ -17,7 +21,26 @@ from config import (
     MAX_TRENDS_PER_COUNTRY,
     MAX_ARTICLES_PER_TREND,
     COUNTRY_DELAY_SECONDS,
+    SCRAPER_POOL_SIZE,
+    TRENDS_REQUESTS_PER_MINUTE,
+    TRENDS_EXTRACTION_MODE,
 )
+from browser_pool import DriverPool, lease_driver
+from checkpoint import Checkpoint
+from google_search import ddg_html_url
+from host_limits import HostRateLimiter, host_of
+import metrics
+from page_waits import wait_for_trend_rows
+from trends_network import capture_trends, drain_performance_log
+
+
+def trends_base_url() -> str:
+    """Trending-now page URL; TRENDS_BASE_URL can point it at a local stand-in."""
+    return (os.environ.get("TRENDS_BASE_URL") or TRENDS_BASE_URL).strip()
+
+
+def trends_extraction_mode() -> str:
+    return (os.environ.get("TRENDS_EXTRACTION_MODE") or TRENDS_EXTRACTION_MODE).strip().lower()
 
 
 def create_driver(headless: bool = True) -> webdriver.Chrome:
@@ -32,6 +55,9 @@ def create_driver(headless: bool = True) -> webdriver.Chrome:
     options.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     )
+    if trends_extraction_mode() == "network":
+        # Expose DevTools network events through driver.get_log("performance")
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     chrome_bin = os.environ.get("CHROME_BIN")
     chromedriver_path = os.environ.get("CHROMEDRIVER_PATH")
     if chrome_bin:
@@ -39,92 +65,195 @@ def create_driver(headless: bool = True) -> webdriver.Chrome:
     if chromedriver_path:
         service = Service(executable_path=chromedriver_path)
     else:
-        service = Service(ChromeDriverManager().install())
+        service = Service(_managed_chromedriver_path())
     return webdriver.Chrome(service=service, options=options)
 
 
+@lru_cache(maxsize=1)
+def _managed_chromedriver_path() -> str:
+    """Resolve chromedriver via webdriver-manager once per process (it may hit the network)."""
+    return ChromeDriverManager().install()
+
+
+def _visited_origins() -> set[str]:
+    """Origins a pooled browser loads: Trends, Google consent and DuckDuckGo."""
+    origins = {
+        "https://trends.google.com",
+        "https://www.google.com",
+        "https://consent.google.com",
+        "https://duckduckgo.com",
+        "https://html.duckduckgo.com",
+    }
+    for url in (trends_base_url(), ddg_html_url()):
+        parts = urlsplit(url)
+        if parts.scheme and parts.netloc:
+            origins.add(f"{parts.scheme}://{parts.netloc}")
+    return origins
+
+
+def reset_driver(driver: webdriver.Chrome) -> None:
+    """
+    Give a reused browser a fresh context: drop every cookie, the cache and the
+    storage of the origins it visits, and park it on about:blank. Raises if the
+    browser is no longer reachable.
+    """
+    # delete_all_cookies() only covers the current page's domain
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    for origin in sorted(_visited_origins()):
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+    driver.get("about:blank")
+
+
+def create_driver_pool(size: int, headless: bool = True) -> DriverPool:
+    """Pool of warm browsers that are reset to a fresh context on every lease."""
+    return DriverPool(size, lambda: create_driver(headless=headless), reset=reset_driver)
+
+
+# Page has table: Trends (title) | Search volume | Started | Trend breakdown.
+# Rows come from the table selector (each row = one trend), else any <tr>.
+_ROW_SELECTOR = "table tbody tr, tr[role='row'], div[role='row']"
+_FALLBACK_SELECTORS = (
+    "div[role='listitem']",
+    "div[class*='trend']",
+    "div[class*='Trend']",
+    "a[href*='trends']",
+)
+_LINK_TEXT_SKIP = ("news", "article", "stories", "search trends")
+_CELL_TEXT_SKIP = (
+    "search volume", "started", "trend breakdown",
+    "past 24 hours", "past 4 hours", "past 48 hours", "past 7 days",
+)
+
+_EXTRACT_PAGE_SCRIPT = """
+const fallbackSelectors = arguments[0];
+const fallbackLimit = arguments[1];
+const text = (el) => (el.innerText || "").trim();
+const href = (a) => (typeof a.href === "string" ? a.href : a.getAttribute("href")) || "";
+const links = (el) => {
+  const anchors = el.tagName.toLowerCase() === "a" ? [el] : Array.from(el.querySelectorAll("a"));
+  return anchors.map((a) => ({ href: href(a), text: text(a) }));
+};
+let rows = Array.from(document.querySelectorAll(%s));
+if (!rows.length) rows = Array.from(document.querySelectorAll("tr"));
+const fallback = {};
+for (const selector of fallbackSelectors) {
+  fallback[selector] = Array.from(document.querySelectorAll(selector))
+    .slice(0, fallbackLimit)
+    .map((el) => ({ text: text(el), links: links(el) }));
+}
+return {
+  rows: rows.map((row) => {
+    let cells = Array.from(row.querySelectorAll("td"));
+    if (!cells.length) cells = Array.from(row.querySelectorAll("div[role='cell']"));
+    return { cells: cells.slice(0, 2).map(text), links: links(row) };
+  }),
+  fallback: fallback,
+};
+""" % json.dumps(_ROW_SELECTOR)
+
+
+def _trends_from_rows(rows: list[dict], seen_keywords: set[str]) -> list[dict]:
+    """Pick keyword + article URLs from extracted table rows."""
+    trends_data = []
+    for row in rows:
+        if len(trends_data) >= MAX_TRENDS_PER_COUNTRY:
+            break
+        # First cell/column usually has the trend title (link or text)
+        keyword = None
+        article_urls = []
+        for link in row.get("links") or []:
+            href = link.get("href") or ""
+            text = (link.get("text") or "").strip()
+            if "google.com" in href or "gstatic.com" in href:
+                continue
+            if href.startswith("http") and href not in article_urls:
+                article_urls.append(href)
+            if text and 2 <= len(text) <= 150 and text not in seen_keywords:
+                if not text.isdigit() and text.lower() not in _LINK_TEXT_SKIP:
+                    keyword = keyword or text
+        if not keyword:
+            for text in row.get("cells") or []:
+                text = (text or "").strip()
+                if text and 2 <= len(text) <= 150 and text not in seen_keywords:
+                    if not text.isdigit() and text.lower() not in _CELL_TEXT_SKIP:
+                        keyword = text
+                        break
+        if keyword:
+            seen_keywords.add(keyword)
+            trends_data.append({
+                "keyword": keyword,
+                "article_urls": article_urls[:MAX_ARTICLES_PER_TREND],
+            })
+    return trends_data
+
+
+def _trends_from_elements(elements: list[dict], seen_keywords: set[str]) -> list[dict]:
+    """Fallback: treat trend-like elements' text as keywords."""
+    trends_data = []
+    for el in elements:
+        if len(trends_data) >= MAX_TRENDS_PER_COUNTRY:
+            break
+        text = (el.get("text") or "").strip()
+        if not text or len(text) < 2 or len(text) > 150 or text in seen_keywords:
+            continue
+        if text.isdigit() or text.lower() in _LINK_TEXT_SKIP:
+            continue
+        seen_keywords.add(text)
+        urls = []
+        for link in el.get("links") or []:
+            h = link.get("href")
+            if h and h.startswith("http") and "google.com" not in h:
+                urls.append(h)
+        trends_data.append({"keyword": text, "article_urls": urls[:MAX_ARTICLES_PER_TREND]})
+    return trends_data
+
+
 def scrape_country_trends(driver: webdriver.Chrome, country: dict) -> list[dict]:
     """
     Scrape one country's Trending now page (e.g. past 4h).
     URL: https://trends.google.com/trending?geo=US&hours=4
-    Returns list of { "keyword": str, "article_urls": list[str] }.
+    Returns list of { "keyword": str, "article_urls": list[str] }; in network mode
+    trends also carry "search_volume", "started" and "breakdown" when available.
     """
+    with metrics.timer("country_scrape_seconds", geo=country["geo"]):
+        trends_data = _scrape_country_page(driver, country)
+    metrics.inc("trends_scraped", len(trends_data), geo=country["geo"])
+    return trends_data
+
+
+def _scrape_country_page(driver: webdriver.Chrome, country: dict) -> list[dict]:
     geo = country["geo"]
-    url = f"{TRENDS_BASE_URL}?geo={geo}&hours={TRENDS_HOURS}"
+    url = f"{trends_base_url()}?geo={geo}&hours={TRENDS_HOURS}"
+    network_mode = trends_extraction_mode() == "network"
     trends_data = []
-
     try:
+        if network_mode:
+            drain_performance_log(driver)  # drop events from the previous page
         driver.get(url)
-        time.sleep(5)  # Allow table/content to load
+        wait_for_trend_rows(driver)
+
+        if network_mode:
+            captured = capture_trends(driver)
+            if captured:
+                return captured[:MAX_TRENDS_PER_COUNTRY]
+            print(f"No trends payload captured for {geo}; falling back to DOM scraping.")
 
-        # Page has table: Trends (title) | Search volume | Started | Trend breakdown
-        # Try table rows first (each row = one trend)
-        rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr, tr[role='row'], div[role='row']")
-        if not rows:
-            rows = driver.find_elements(By.TAG_NAME, "tr")
+        # One injected script returns every row's cells and links (plus fallback
+        # candidates) as JSON; filtering then runs in Python without further RPCs.
+        page = driver.execute_script(
+            _EXTRACT_PAGE_SCRIPT,
+            list(_FALLBACK_SELECTORS),
+            MAX_TRENDS_PER_COUNTRY * 2,
+        ) or {}
         seen_keywords = set()
-        for row in rows:
-            if len(trends_data) >= MAX_TRENDS_PER_COUNTRY:
-                break
-            try:
-                # First cell/column usually has the trend title (link or text)
-                cells = row.find_elements(By.TAG_NAME, "td")
-                if not cells:
-                    cells = row.find_elements(By.CSS_SELECTOR, "div[role='cell']")
-                links_in_row = row.find_elements(By.TAG_NAME, "a")
-                keyword = None
-                article_urls = []
-                for a in links_in_row:
-                    href = a.get_attribute("href") or ""
-                    text = (a.text or "").strip()
-                    if "google.com" in href or "gstatic.com" in href:
-                        continue
-                    if href.startswith("http") and href not in article_urls:
-                        article_urls.append(href)
-                    if text and 2 <= len(text) <= 150 and text not in seen_keywords:
-                        if not text.isdigit() and text.lower() not in ("news", "article", "stories", "search trends"):
-                            keyword = keyword or text
-                if not keyword and cells:
-                    for cell in cells[:2]:
-                        text = (cell.text or "").strip()
-                        if text and 2 <= len(text) <= 150 and text not in seen_keywords:
-                            if not text.isdigit() and text.lower() not in ("search volume", "started", "trend breakdown", "past 24 hours", "past 4 hours", "past 48 hours", "past 7 days"):
-                                keyword = text
-                                break
-                if keyword:
-                    seen_keywords.add(keyword)
-                    trends_data.append({
-                        "keyword": keyword,
-                        "article_urls": article_urls[:MAX_ARTICLES_PER_TREND],
-                    })
-            except Exception:
-                continue
+        trends_data = _trends_from_rows(page.get("rows") or [], seen_keywords)
 
         # Fallback: any clickable trend-like text or list items
         if not trends_data:
-            for selector in (
-                "div[role='listitem']",
-                "div[class*='trend']",
-                "div[class*='Trend']",
-                "a[href*='trends']",
-            ):
-                elms = driver.find_elements(By.CSS_SELECTOR, selector)
-                for el in elms[:MAX_TRENDS_PER_COUNTRY * 2]:
-                    if len(trends_data) >= MAX_TRENDS_PER_COUNTRY:
-                        break
-                    text = (el.text or "").strip()
-                    if not text or len(text) < 2 or len(text) > 150 or text in seen_keywords:
-                        continue
-                    if text.isdigit() or text.lower() in ("news", "article", "stories", "search trends"):
-                        continue
-                    seen_keywords.add(text)
-                    links = el.find_elements(By.TAG_NAME, "a") if el.tag_name != "a" else [el]
-                    urls = []
-                    for a in links:
-                        h = a.get_attribute("href")
-                        if h and h.startswith("http") and "google.com" not in h:
-                            urls.append(h)
-                    trends_data.append({"keyword": text, "article_urls": urls[:MAX_ARTICLES_PER_TREND]})
+            fallback = page.get("fallback") or {}
+            for selector in _FALLBACK_SELECTORS:
+                trends_data = _trends_from_elements(fallback.get(selector) or [], seen_keywords)
                 if trends_data:
                     break
     except Exception as e:
@@ -132,17 +261,43 @@ def scrape_country_trends(driver: webdriver.Chrome, country: dict) -> list[dict]
     return trends_data[:MAX_TRENDS_PER_COUNTRY]
 
 
-def scrape_all_trends(headless: bool = True, countries: list[dict] | None = None) -> list[dict]:
+def scrape_all_trends(
+    headless: bool = True,
+    countries: list[dict] | None = None,
+    pool_size: int | None = None,
+    pool: DriverPool | None = None,
+    on_country: Callable[[dict], None] | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> list[dict]:
     """
     Scrape real-time trends for given countries (default: all from config).
+    `on_country` is called with each country's result as soon as it is scraped.
+    With a `checkpoint`, countries it already holds are not scraped again and
+    each newly scraped country is saved to it.
+    With pool_size > 1 (or SCRAPER_POOL_SIZE) countries are scraped concurrently
+    by a pool of drivers, paced by a per-host budget instead of a fixed delay.
+    Pass a long-lived `pool` to reuse warm browsers instead of starting new ones.
     Returns list of { "country": str, "geo": str, "trends": [ { "keyword", "article_urls" } ] }.
     """
-    driver = create_driver(headless=headless)
     to_scrape = countries if countries is not None else TREND_COUNTRIES
+    if pool_size is None:
+        pool_size = pool.size if pool is not None else int(
+            os.environ.get("SCRAPER_POOL_SIZE", str(SCRAPER_POOL_SIZE))
+        )
+    if pool_size > 1 and len(to_scrape) > 1:
+        return _scrape_all_trends_pooled(to_scrape, headless, pool_size, pool, on_country, checkpoint)
+
     country_delay_seconds = int(os.environ.get("COUNTRY_DELAY_SECONDS", str(COUNTRY_DELAY_SECONDS)))
     results = []
-    try:
+    with lease_driver(pool, lambda: create_driver(headless=headless)) as driver:
         for index, country in enumerate(to_scrape):
+            saved = checkpoint.country(country["geo"]) if checkpoint is not None else None
+            if saved is not None:
+                print(f"Using checkpointed trends for {country['name']} ({country['geo']}).")
+                results.append(saved)
+                if on_country is not None:
+                    on_country(saved)
+                continue
             print(f"Scraping {country['name']} ({country['geo']})...")
             trends = scrape_country_trends(driver, country)
             results.append({
@@ -150,11 +305,66 @@ def scrape_all_trends(headless: bool = True, countries: list[dict] | None = None
                 "geo": country["geo"],
                 "trends": trends,
             })
+            if checkpoint is not None:
+                checkpoint.save_country(results[-1])
+            if on_country is not None:
+                on_country(results[-1])
             if index < len(to_scrape) - 1 and country_delay_seconds > 0:
                 print(
                     f"Waiting {country_delay_seconds} seconds before scraping the next country...",
                 )
                 time.sleep(country_delay_seconds)
-    finally:
-        driver.quit()
     return results
+
+
+def _scrape_all_trends_pooled(
+    to_scrape: list[dict],
+    headless: bool,
+    pool_size: int,
+    shared_pool: DriverPool | None = None,
+    on_country: Callable[[dict], None] | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> list[dict]:
+    """Scrape countries with up to pool_size drivers, sharing one request budget for the Trends host."""
+    requests_per_minute = float(
+        os.environ.get("TRENDS_REQUESTS_PER_MINUTE", str(TRENDS_REQUESTS_PER_MINUTE))
+    )
+    limiter = HostRateLimiter(60.0 / requests_per_minute if requests_per_minute > 0 else 0.0)
+    trends_host = host_of(trends_base_url())
+    pool = shared_pool or DriverPool(min(pool_size, len(to_scrape)), lambda: create_driver(headless=headless))
+    workers = min(pool.size, len(to_scrape))
+
+    def scrape_one(country: dict) -> dict:
+        saved = checkpoint.country(country["geo"]) if checkpoint is not None else None
+        if saved is not None:
+            print(f"Using checkpointed trends for {country['name']} ({country['geo']}).")
+            if on_country is not None:
+                on_country(saved)
+            return saved
+        with pool.driver() as driver:
+            waited = limiter.wait(trends_host)
+            if waited > 0:
+                print(f"Rate budget: waited {waited:.0f}s before {country['geo']}.")
+            print(f"Scraping {country['name']} ({country['geo']})...")
+            trends = scrape_country_trends(driver, country)
+        result = {
+            "country": country["name"],
+            "geo": country["geo"],
+            "trends": trends,
+        }
+        if checkpoint is not None:
+            checkpoint.save_country(result)
+        if on_country is not None:
+            on_country(result)
+        return result
+
+    print(
+        f"Scraping {len(to_scrape)} countries with {workers} drivers "
+        f"({requests_per_minute:g} requests/minute to {trends_host})..."
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(scrape_one, to_scrape))
+    finally:
+        if shared_pool is None:
+            pool.close()
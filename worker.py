@@ -9,19 +9,31 @@ Environment:
   HEADLESS=true        Use headless browser mode.
   SCRAPER_SCRIPT=run_scraper.py
                        Choose source runner.
+  WORKER_MODE=subprocess
+                       "subprocess" starts a fresh Python process per run.
+                       "inprocess" imports the runner and keeps warm browsers
+                       alive between runs and between scrape/enrich stages.
+  WORKER_BROWSER_POOL_SIZE=1
+                       Warm browsers kept by the in-process worker.
+  METRICS_PORT=        Serve the latest runs' metrics in Prometheus text
+                       format at :<port>/metrics (unset = off).
+
+Each cycle first retries webhook deliveries left in the outbox by earlier runs.
 """
 
+import importlib
 import os
 import subprocess
 import sys
 import time
+import traceback
 from datetime import datetime, timezone
 
 
 def run_scraper_once() -> int:
     env = os.environ.copy()
     env.setdefault("HEADLESS", "true")
-    runner_script = env.get("SCRAPER_SCRIPT", "run_scraper.py").strip() or "run_scraper.py"
+    runner_script = runner_script_name()
 
     print(f"[{timestamp()}] Starting scraper run using {runner_script}...", flush=True)
     result = subprocess.run(
@@ -36,6 +48,46 @@ def run_scraper_once() -> int:
     return result.returncode
 
 
+def runner_script_name() -> str:
+    return os.environ.get("SCRAPER_SCRIPT", "run_scraper.py").strip() or "run_scraper.py"
+
+
+def run_scraper_in_process(pool) -> int:
+    """Call the runner's main() in this process, lending it the warm browser pool."""
+    os.environ.setdefault("HEADLESS", "true")
+    runner_script = runner_script_name()
+    module_name = os.path.splitext(os.path.basename(runner_script))[0]
+
+    print(f"[{timestamp()}] Starting in-process scraper run using {runner_script}...", flush=True)
+    try:
+        importlib.import_module(module_name).main(pool=pool)
+        returncode = 0
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    print(
+        f"[{timestamp()}] Scraper finished with exit code {returncode}",
+        flush=True,
+    )
+    return returncode
+
+
+def drain_outbox() -> None:
+    """Retry deliveries that earlier runs could not complete."""
+    from outbox import Outbox, mark_sent_callback
+    from run_state import RunState, incremental_enabled
+
+    run_state = RunState() if incremental_enabled() else None
+    try:
+        with Outbox() as outbox:
+            outbox.drain(mark_sent_callback(run_state))
+    except Exception:
+        traceback.print_exc()
+    finally:
+        if run_state is not None:
+            run_state.close()
+
+
 def timestamp() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -43,18 +95,42 @@ def timestamp() -> str:
 def main() -> None:
     run_once = os.environ.get("RUN_ONCE", "false").lower() == "true"
     interval_minutes = int(os.environ.get("SCRAPE_INTERVAL_MINUTES", "360"))
+    in_process = os.environ.get("WORKER_MODE", "subprocess").strip().lower() == "inprocess"
+
+    metrics_port = os.environ.get("METRICS_PORT", "").strip()
+    if metrics_port:
+        from metrics import serve_prometheus
 
-    if run_once:
-        raise SystemExit(run_scraper_once())
+        serve_prometheus(int(metrics_port))
 
-    while True:
-        run_scraper_once()
-        sleep_seconds = max(interval_minutes, 1) * 60
-        print(
-            f"[{timestamp()}] Sleeping for {interval_minutes} minutes before next run.",
-            flush=True,
+    pool = None
+    if in_process:
+        from trends_scraper import create_driver_pool
+
+        pool = create_driver_pool(
+            int(os.environ.get("WORKER_BROWSER_POOL_SIZE", "1")),
+            headless=os.environ.get("HEADLESS", "true").lower() == "true",
         )
-        time.sleep(sleep_seconds)
+
+    def run() -> int:
+        drain_outbox()
+        return run_scraper_in_process(pool) if in_process else run_scraper_once()
+
+    try:
+        if run_once:
+            raise SystemExit(run())
+
+        while True:
+            run()
+            sleep_seconds = max(interval_minutes, 1) * 60
+            print(
+                f"[{timestamp()}] Sleeping for {interval_minutes} minutes before next run.",
+                flush=True,
+            )
+            time.sleep(sleep_seconds)
+    finally:
+        if pool is not None:
+            pool.close()
 
 
 if __name__ == "__main__":